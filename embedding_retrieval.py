@@ -6,7 +6,7 @@ Handles text embedding generation and FAISS-based semantic search
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterable
 import logging
 
 # Configure logging
@@ -111,6 +111,66 @@ class EmbeddingRetriever:
             logger.error(f"Error building FAISS index: {str(e)}")
             raise
     
+    def _index_batch(self, batch: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Embed a batch of chunks and append it to the FAISS index.
+        
+        Args:
+            batch: Chunk dictionaries with 'text' field
+            
+        Returns:
+            np.ndarray: Embeddings of the batch
+        """
+        embeddings = self.model.encode(
+            [chunk["text"] for chunk in batch],
+            batch_size=len(batch),
+            convert_to_numpy=True
+        ).astype('float32')
+        
+        if self.index is None:
+            self.index = faiss.IndexFlatL2(embeddings.shape[1])
+        self.index.add(embeddings)
+        self.chunks.extend(batch)
+        return embeddings
+    
+    def add_chunks(self, chunks: Iterable[Dict[str, Any]], batch_size: int = 32) -> int:
+        """
+        Embed and index chunks incrementally as they arrive.
+        
+        Chunks are encoded in batches and appended to the FAISS index, so a
+        chunk generator can be indexed while it is still producing chunks.
+        
+        Args:
+            chunks: Iterable of chunk dictionaries with 'text' field
+            batch_size: Number of chunks to encode at a time
+            
+        Returns:
+            int: Number of chunks added
+        """
+        embedding_batches = [] if self.embeddings is None else [self.embeddings]
+        batch = []
+        added = 0
+        
+        try:
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) == batch_size:
+                    embedding_batches.append(self._index_batch(batch))
+                    added += len(batch)
+                    batch = []
+            if batch:
+                embedding_batches.append(self._index_batch(batch))
+                added += len(batch)
+        except Exception as e:
+            logger.error(f"Error adding chunks to index: {str(e)}")
+            raise
+        finally:
+            if embedding_batches:
+                self.embeddings = np.concatenate(embedding_batches)
+        
+        logger.info(f"Indexed {added} chunks incrementally, {len(self.chunks)} total")
+        return added
+    
     def retrieve_relevant_chunks(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
         """
         Retrieve the most relevant chunks for a given query.
@@ -180,13 +240,14 @@ class EmbeddingRetriever:
         return stats
 
 
-def initialize_retrieval_system(chunks: List[Dict[str, Any]], 
+def initialize_retrieval_system(chunks: Iterable[Dict[str, Any]], 
                               model_name: str = "all-MiniLM-L6-v2") -> EmbeddingRetriever:
     """
     Initialize the complete retrieval system with chunks.
     
     Args:
-        chunks: List of text chunks with metadata
+        chunks: List of text chunks with metadata, or an iterator of chunks
+            to embed and index as they are produced
         model_name: SentenceTransformer model name
         
     Returns:
@@ -197,6 +258,11 @@ def initialize_retrieval_system(chunks: List[Dict[str, Any]],
     # Create retriever
     retriever = EmbeddingRetriever(model_name=model_name)
     
+    if not isinstance(chunks, list):
+        retriever.add_chunks(chunks)
+        logger.info("Retrieval system initialization complete")
+        return retriever
+    
     if not chunks:
         logger.warning("No chunks provided - retrieval system will be empty")
         return retriever
@@ -5,6 +5,7 @@ Provides integration with Google's Gemini AI models
 
 import os
 import logging
+import threading
 from typing import Dict, Any, Optional
 from dataclasses import dataclass
 
@@ -27,6 +28,7 @@ class GeminiConfig:
     model: str = "gemini-1.5-flash"  # Default to Gemini 1.5 Flash for speed and efficiency
     max_tokens: int = 500
     temperature: float = 0.7
+    validate_on_init: bool = False  # Probe the API during construction (costs a round-trip)
 
 
 class GeminiClient:
@@ -45,6 +47,7 @@ class GeminiClient:
         self.config = config
         self.model = None
         self.model_name = config.model
+        self.healthy: Optional[bool] = None  # Unknown until the first request or ping()
         
         try:
             # Configure Gemini API
@@ -61,8 +64,10 @@ class GeminiClient:
                 generation_config=generation_config
             )
             
-            # Test the connection
-            self._test_connection()
+            # Only probe the API when explicitly requested; otherwise the
+            # first real request doubles as the health check
+            if config.validate_on_init:
+                self._test_connection()
             logger.info(f"Gemini client initialized successfully with model: {self.model_name}")
             
         except Exception as e:
@@ -74,6 +79,7 @@ class GeminiClient:
         try:
             # Make a simple test call
             response = self.model.generate_content("Hello")
+            self.healthy = True
             logger.info("Gemini connection test successful")
         except Exception as e:
             error_str = str(e)
@@ -82,9 +88,23 @@ class GeminiClient:
                 # Don't raise for quota errors - client can still be used later
                 return
             else:
+                self.healthy = False
                 logger.error(f"Gemini connection test failed: {error_str}")
                 raise
     
+    def ping(self) -> bool:
+        """
+        Explicitly check that the Gemini API is reachable (e.g. for a health endpoint).
+        
+        Returns:
+            bool: True if the API responded, False otherwise
+        """
+        try:
+            self._test_connection()
+            return self.healthy is not False
+        except Exception:
+            return False
+    
     def generate_response(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """
         Generate response using Google Gemini.
@@ -117,23 +137,27 @@ class GeminiClient:
             
             # Generate content
             response = model.generate_content(prompt)
+            self.healthy = True
             
-            # Extract response text
-            response_text = response.text if response.text else "No response generated"
+            # Extract response text and usage once
+            response_text = response.text or "No response generated"
+            usage_metadata = getattr(response, 'usage_metadata', None)
+            candidates = response.candidates
             
             return {
                 "success": True,
                 "response": response_text,
                 "model": self.config.model,
                 "usage": {
-                    "prompt_tokens": getattr(response.usage_metadata, 'prompt_token_count', 0) if hasattr(response, 'usage_metadata') else 0,
-                    "completion_tokens": getattr(response.usage_metadata, 'candidates_token_count', 0) if hasattr(response, 'usage_metadata') else 0,
-                    "total_tokens": getattr(response.usage_metadata, 'total_token_count', 0) if hasattr(response, 'usage_metadata') else 0
+                    "prompt_tokens": getattr(usage_metadata, 'prompt_token_count', 0) if usage_metadata else 0,
+                    "completion_tokens": getattr(usage_metadata, 'candidates_token_count', 0) if usage_metadata else 0,
+                    "total_tokens": getattr(usage_metadata, 'total_token_count', 0) if usage_metadata else 0
                 },
-                "finish_reason": getattr(response.candidates[0], 'finish_reason', 'STOP') if response.candidates else 'UNKNOWN'
+                "finish_reason": getattr(candidates[0], 'finish_reason', 'STOP') if candidates else 'UNKNOWN'
             }
             
         except Exception as e:
+            self.healthy = False
             logger.error(f"Error generating Gemini response: {str(e)}")
             return {
                 "success": False,
@@ -149,7 +173,8 @@ class GeminiClient:
             "max_tokens": self.config.max_tokens,
             "temperature": self.config.temperature,
             "api_configured": bool(self.config.api_key),
-            "model_initialized": self.model is not None
+            "model_initialized": self.model is not None,
+            "connection_verified": self.healthy
         }
 
 
@@ -189,18 +214,28 @@ def initialize_gemini_client() -> Optional[GeminiClient]:
         return None
 
 
-def create_academic_prompt_gemini(context: str, question: str) -> str:
+# Process-wide client shared across sessions/worker threads
+_gemini_client: Optional[GeminiClient] = None
+_gemini_lock = threading.Lock()
+
+
+def get_gemini_client() -> Optional[GeminiClient]:
     """
-    Create a structured prompt for academic Q&A optimized for Gemini models.
+    Get the process-wide Gemini client, initializing it on first use.
     
-    Args:
-        context: Retrieved context from documents
-        question: User's question
-        
     Returns:
-        str: Formatted prompt for Gemini
+        GeminiClient instance or None if initialization fails
     """
-    prompt = f"""You are an expert academic assistant helping students understand their course materials. Answer the following question based strictly on the provided context from academic documents.
+    global _gemini_client
+    if _gemini_client is None:
+        with _gemini_lock:
+            if _gemini_client is None:
+                _gemini_client = initialize_gemini_client()
+    return _gemini_client
+
+
+# Static segments of the academic Q&A prompt; only the context and question vary
+PROMPT_HEAD = """You are an expert academic assistant helping students understand their course materials. Answer the following question based strictly on the provided context from academic documents.
 
 RESPONSE STRUCTURE:
 1. **MAIN ANSWER**: Start with the direct, concise answer to the question
@@ -216,14 +251,28 @@ GUIDELINES:
 - Avoid using outside knowledge not present in the documents
 
 CONTEXT:
-{context}
+"""
+PROMPT_MID = """
 
 QUESTION:
-{question}
+"""
+PROMPT_TAIL = """
 
 ANSWER:"""
+
+
+def create_academic_prompt_gemini(context: str, question: str) -> str:
+    """
+    Create a structured prompt for academic Q&A optimized for Gemini models.
     
-    return prompt
+    Args:
+        context: Retrieved context from documents
+        question: User's question
+        
+    Returns:
+        str: Formatted prompt for Gemini
+    """
+    return "".join([PROMPT_HEAD, context, PROMPT_MID, question, PROMPT_TAIL])
 
 
 def query_gemini(client: GeminiClient, 
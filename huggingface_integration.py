@@ -4,17 +4,43 @@ Free alternative to IBM Watsonx using Hugging Face models
 """
 
 import os
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+import threading
+from typing import Optional, Dict, Any, List
 import requests
 import json
-from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
+from transformers import AutoTokenizer, AutoModelForCausalLM
 import torch
 
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def _new_async_http_client() -> "httpx.AsyncClient":
+    """
+    Create an async HTTP client for the Inference API, preferring HTTP/2 when h2 is installed.
+    
+    Pooled connections belong to the event loop that opened them, so callers
+    use a client within one loop and close it (async with) before the loop ends.
+    """
+    client_options = {
+        "limits": httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        "timeout": httpx.Timeout(30.0, connect=3.0)
+    }
+    try:
+        return httpx.AsyncClient(http2=True, **client_options)
+    except ImportError:
+        logger.info("h2 package not installed, using HTTP/1.1 for Hugging Face API")
+        return httpx.AsyncClient(**client_options)
+
 class HuggingFaceClient:
     """
     Hugging Face client for text generation using local or API models.
@@ -33,7 +59,6 @@ class HuggingFaceClient:
         self.api_token = os.getenv("HUGGINGFACE_API_TOKEN")
         self.model = None
         self.tokenizer = None
-        self.pipeline = None
         
         if use_api and not self.api_token:
             logger.warning("Hugging Face API token not found, falling back to local model")
@@ -92,14 +117,8 @@ class HuggingFaceClient:
                     if self.tokenizer.pad_token is None:
                         self.tokenizer.pad_token = self.tokenizer.eos_token
                     
-                    # Create text generation pipeline
-                    self.pipeline = pipeline(
-                        "text-generation",
-                        model=self.model,
-                        tokenizer=self.tokenizer,
-                        device=0 if device == "cuda" else -1,
-                        torch_dtype=torch.float16 if device == "cuda" else torch.float32
-                    )
+                    # Truncate prompts from the left so the question is kept
+                    self.tokenizer.truncation_side = "left"
                     
                     self.model_name = model_name
                     logger.info(f"Successfully loaded {model_name}")
@@ -109,7 +128,7 @@ class HuggingFaceClient:
                     logger.warning(f"Failed to load {model_name}: {e}")
                     continue
             
-            if self.pipeline is None:
+            if self.model is None:
                 raise Exception("Failed to load any model")
                 
         except Exception as e:
@@ -120,12 +139,17 @@ class HuggingFaceClient:
         """Initialize a simple fallback model."""
         try:
             logger.info("Initializing fallback model...")
-            self.pipeline = pipeline("text-generation", model="distilgpt2")
+            self.tokenizer = AutoTokenizer.from_pretrained("distilgpt2")
+            self.model = AutoModelForCausalLM.from_pretrained("distilgpt2")
+            if self.tokenizer.pad_token is None:
+                self.tokenizer.pad_token = self.tokenizer.eos_token
+            self.tokenizer.truncation_side = "left"
             self.model_name = "distilgpt2"
             logger.info("Fallback model initialized")
         except Exception as e:
             logger.error(f"Fallback model failed: {e}")
-            self.pipeline = None
+            self.model = None
+            self.tokenizer = None
     
     def generate_response(self, 
                          prompt: str,
@@ -153,26 +177,126 @@ class HuggingFaceClient:
             logger.error(f"Response generation failed: {e}")
             return None
     
+    async def generate_response_async(self,
+                                      prompt: str,
+                                      max_new_tokens: int = 300,
+                                      temperature: float = 0.7,
+                                      http_client: Optional["httpx.AsyncClient"] = None,
+                                      **kwargs) -> Optional[str]:
+        """
+        Generate response without blocking the event loop.
+        
+        API requests go over an async httpx client; local generation runs in
+        a worker thread.
+        
+        Args:
+            prompt: Input prompt
+            max_new_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            http_client: Optional async HTTP client shared within the current event
+                loop; a temporary one is used otherwise
+            
+        Returns:
+            Generated response or None if failed
+        """
+        try:
+            if self.use_api and HTTPX_AVAILABLE:
+                if http_client is None:
+                    async with _new_async_http_client() as temp_client:
+                        return await self._generate_api_response_async(prompt, max_new_tokens, temperature, temp_client)
+                return await self._generate_api_response_async(prompt, max_new_tokens, temperature, http_client)
+            elif self.use_api:
+                return await asyncio.to_thread(self._generate_api_response, prompt, max_new_tokens, temperature)
+            else:
+                return await asyncio.to_thread(self._generate_local_response, prompt, max_new_tokens, temperature)
+                
+        except Exception as e:
+            logger.error(f"Response generation failed: {e}")
+            return None
+    
+    async def generate_batch(self, prompts: List[str], max_new_tokens: int = 300,
+                             temperature: float = 0.7) -> List[Optional[str]]:
+        """
+        Generate responses for several prompts concurrently.
+        
+        API requests in the batch share one connection pool, which is closed
+        when the batch finishes.
+        
+        Args:
+            prompts: Input prompts
+            max_new_tokens: Maximum tokens to generate per prompt
+            temperature: Sampling temperature
+            
+        Returns:
+            List of generated responses (None for failures), in the same order as prompts
+        """
+        if not (self.use_api and HTTPX_AVAILABLE):
+            return await asyncio.gather(*[
+                self.generate_response_async(prompt, max_new_tokens, temperature) for prompt in prompts
+            ])
+        
+        async with _new_async_http_client() as http_client:
+            return await asyncio.gather(*[
+                self.generate_response_async(prompt, max_new_tokens, temperature, http_client) for prompt in prompts
+            ])
+    
+    def generate_batch_sync(self, prompts: List[str], max_new_tokens: int = 300,
+                            temperature: float = 0.7) -> List[Optional[str]]:
+        """
+        Blocking wrapper around generate_batch for synchronous callers.
+        
+        Args:
+            prompts: Input prompts
+            max_new_tokens: Maximum tokens to generate per prompt
+            temperature: Sampling temperature
+            
+        Returns:
+            List of generated responses (None for failures), in the same order as prompts
+        """
+        return asyncio.run(self.generate_batch(prompts, max_new_tokens, temperature))
+    
+    def _build_api_payload(self, prompt: str, max_new_tokens: int, temperature: float) -> Dict[str, Any]:
+        """Build the Inference API request payload."""
+        return {
+            "inputs": prompt,
+            "parameters": {
+                "max_new_tokens": max_new_tokens,
+                "temperature": temperature,
+                "return_full_text": False
+            }
+        }
+    
+    def _parse_api_result(self, result: Any) -> Optional[str]:
+        """Extract the generated text from an Inference API result."""
+        if isinstance(result, list) and len(result) > 0:
+            return result[0].get("generated_text", "").strip()
+        
+        return None
+    
     def _generate_api_response(self, prompt: str, max_new_tokens: int, temperature: float) -> Optional[str]:
         """Generate response using Hugging Face API."""
         try:
-            payload = {
-                "inputs": prompt,
-                "parameters": {
-                    "max_new_tokens": max_new_tokens,
-                    "temperature": temperature,
-                    "return_full_text": False
-                }
-            }
+            payload = self._build_api_payload(prompt, max_new_tokens, temperature)
             
             response = requests.post(self.api_url, headers=self.headers, json=payload)
             response.raise_for_status()
             
-            result = response.json()
-            if isinstance(result, list) and len(result) > 0:
-                return result[0].get("generated_text", "").strip()
+            return self._parse_api_result(response.json())
             
+        except Exception as e:
+            logger.error(f"API response generation failed: {e}")
             return None
+    
+    async def _generate_api_response_async(self, prompt: str, max_new_tokens: int, temperature: float,
+                                           http_client: "httpx.AsyncClient") -> Optional[str]:
+        """Generate response using Hugging Face API over the given async client."""
+        try:
+            payload = self._build_api_payload(prompt, max_new_tokens, temperature)
+            
+            response = await http_client.post(self.api_url, headers=self.headers, json=payload)
+            response.raise_for_status()
+            
+            return self._parse_api_result(response.json())
             
         except Exception as e:
             logger.error(f"API response generation failed: {e}")
@@ -181,27 +305,38 @@ class HuggingFaceClient:
     def _generate_local_response(self, prompt: str, max_new_tokens: int, temperature: float) -> Optional[str]:
         """Generate response using local model."""
         try:
-            if not self.pipeline:
+            if self.model is None or self.tokenizer is None:
                 return None
             
-            # Truncate prompt if too long
-            max_prompt_length = 512
-            if len(prompt) > max_prompt_length:
-                prompt = prompt[-max_prompt_length:]
+            max_new_tokens = min(max_new_tokens, 200)  # Limit for performance
             
-            # Generate response
-            outputs = self.pipeline(
+            # Truncate by tokens so the prompt plus the generated tokens fit the
+            # model's context window
+            input_ids = self.tokenizer(
                 prompt,
-                max_new_tokens=min(max_new_tokens, 200),  # Limit for performance
-                temperature=temperature,
-                do_sample=True,
-                pad_token_id=self.tokenizer.eos_token_id,
-                return_full_text=False,
-                clean_up_tokenization_spaces=True
-            )
+                return_tensors="pt",
+                truncation=True,
+                max_length=self._context_window() - max_new_tokens
+            ).input_ids.to(self.model.device)
+            
+            # Generate response
+            with torch.no_grad():
+                output_ids = self.model.generate(
+                    input_ids,
+                    max_new_tokens=max_new_tokens,
+                    temperature=temperature,
+                    do_sample=True,
+                    pad_token_id=self.tokenizer.eos_token_id
+                )
             
-            if outputs and len(outputs) > 0:
-                generated_text = outputs[0]["generated_text"].strip()
+            # Only decode the newly generated tokens
+            generated_ids = output_ids[0, input_ids.shape[-1]:]
+            if len(generated_ids) > 0:
+                generated_text = self.tokenizer.decode(
+                    generated_ids,
+                    skip_special_tokens=True,
+                    clean_up_tokenization_spaces=True
+                ).strip()
                 
                 # Clean up the response
                 generated_text = self._clean_response(generated_text)
@@ -214,28 +349,36 @@ class HuggingFaceClient:
             logger.error(f"Local response generation failed: {e}")
             return None
     
-    def _clean_response(self, text: str) -> str:
+    def _context_window(self) -> int:
+        """Get the maximum number of positions the loaded model can attend to."""
+        config = self.model.config
+        return getattr(config, "n_positions", None) or getattr(config, "max_position_embeddings", 1024)
+    
+    def _clean_response(self, text: str, max_output_chars: int = 2000) -> str:
         """Clean and format the generated response."""
-        # Remove repetitive patterns
+        # Remove repetitive patterns, stopping once the length limit is reached
         lines = text.split('\n')
         cleaned_lines = []
+        total_length = 0
         
         for line in lines:
             line = line.strip()
             if line and line not in cleaned_lines[-3:]:  # Avoid recent repetitions
+                total_length += len(line) + 1
+                if total_length > max_output_chars:
+                    # Keep the part of this line that still fits
+                    cleaned_lines.append(line[:max_output_chars - (total_length - len(line) - 1)])
+                    break
                 cleaned_lines.append(line)
         
-        # Join and limit length
         cleaned_text = ' '.join(cleaned_lines)
         
         # Ensure it ends properly
         if cleaned_text and not cleaned_text.endswith(('.', '!', '?')):
-            # Find last complete sentence
-            for punct in ['.', '!', '?']:
-                last_punct = cleaned_text.rfind(punct)
-                if last_punct > len(cleaned_text) * 0.7:  # If punctuation is in last 30%
-                    cleaned_text = cleaned_text[:last_punct + 1]
-                    break
+            # Snap to the last complete sentence if it is in the last 30%
+            last_punct = max(cleaned_text.rfind(punct) for punct in '.!?')
+            if last_punct > len(cleaned_text) * 0.7:
+                cleaned_text = cleaned_text[:last_punct + 1]
         
         return cleaned_text
     
@@ -253,7 +396,7 @@ class HuggingFaceClient:
             "model_name": self.model_name,
             "use_api": self.use_api,
             "api_token_configured": bool(self.api_token),
-            "model_loaded": self.pipeline is not None,
+            "model_loaded": self.model is not None,
             "device": "cuda" if torch.cuda.is_available() else "cpu"
         }
 
@@ -296,6 +439,42 @@ def initialize_huggingface_client() -> Optional[HuggingFaceClient]:
         return None
 
 
+# Process-wide client shared across sessions/worker threads so the model is loaded once
+_hf_client: Optional[HuggingFaceClient] = None
+_hf_lock = threading.Lock()
+
+
+def get_huggingface_client() -> Optional[HuggingFaceClient]:
+    """
+    Get the process-wide Hugging Face client, initializing it on first use.
+    
+    When serving with several worker processes, start them with gunicorn's
+    ``--preload`` flag so the model is loaded once in the master process and
+    shared copy-on-write with the forked workers.
+    
+    Returns:
+        HuggingFaceClient or None if initialization failed
+    """
+    global _hf_client
+    if _hf_client is None:
+        with _hf_lock:
+            if _hf_client is None:
+                _hf_client = initialize_huggingface_client()
+    return _hf_client
+
+
+# Static segments of the academic Q&A prompt; only the context and question vary
+PROMPT_HEAD = """Based on the following academic content, please answer the question clearly and concisely. Do not mention "Context", "Section", or document references in your response.
+
+Content: """
+PROMPT_MID = """...
+
+Question: """
+PROMPT_TAIL = """
+
+Answer:"""
+
+
 def create_academic_prompt_hf(context: str, question: str) -> str:
     """
     Create a prompt optimized for Hugging Face models.
@@ -307,12 +486,4 @@ def create_academic_prompt_hf(context: str, question: str) -> str:
     Returns:
         Formatted prompt
     """
-    prompt = f"""Based on the following academic content, please answer the question clearly and concisely. Do not mention "Context", "Section", or document references in your response.
-
-Content: {context[:1000]}...
-
-Question: {question}
-
-Answer:"""
-    
-    return prompt
+    return "".join([PROMPT_HEAD, context[:1000], PROMPT_MID, question, PROMPT_TAIL])
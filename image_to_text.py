@@ -6,44 +6,314 @@ Image to Text Module - Convert images to text using Hugging Face API
 import os
 import io
 import base64
+import asyncio
+import hashlib
 import logging
+import shutil
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 import requests
-from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Optional, Dict, Any, List, Tuple, Union, NamedTuple
 from PIL import Image
 import streamlit as st
 from dotenv import load_dotenv
 
+from utils import LRUDiskCache
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    import json
+    ORJSON_AVAILABLE = False
+
+
+@functools.lru_cache(maxsize=1)
+def _find_tesseract_cmd() -> Optional[str]:
+    """Locate the Tesseract executable, checking PATH before common install folders."""
+    # Common Tesseract installation paths on Windows
+    possible_paths = [
+        r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+        r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+        r'C:\Users\{}\AppData\Local\Tesseract-OCR\tesseract.exe'.format(os.getenv('USERNAME', '')),
+    ]
+    return shutil.which('tesseract') or next((path for path in possible_paths if os.path.exists(path)), None)
+
+
 # Try to import OCR libraries
 try:
-    import pytesseract
     import cv2
     import numpy as np
 
-    # Configure Tesseract path for Windows
-    if os.name == 'nt':  # Windows
-        # Common Tesseract installation paths on Windows
-        possible_paths = [
-            r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-            r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-            r'C:\Users\{}\AppData\Local\Tesseract-OCR\tesseract.exe'.format(os.getenv('USERNAME', '')),
-        ]
+    try:
+        # In-process Tesseract bindings; avoids spawning tesseract per image
+        import tesserocr
+        TESSEROCR_AVAILABLE = True
+    except ImportError:
+        TESSEROCR_AVAILABLE = False
+        import pytesseract
 
-        for path in possible_paths:
-            if os.path.exists(path):
-                pytesseract.pytesseract.tesseract_cmd = path
-                break
+        # Configure Tesseract path for Windows
+        if os.name == 'nt':  # Windows
+            tesseract_cmd = _find_tesseract_cmd()
+            if tesseract_cmd:
+                pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
 
     LOCAL_OCR_AVAILABLE = True
 except ImportError:
     LOCAL_OCR_AVAILABLE = False
+    TESSEROCR_AVAILABLE = False
 
 # Load environment variables
 load_dotenv()
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Local Tesseract results at or above these thresholds are trusted without
+# escalating to the (much slower) Hugging Face API
+LOCAL_OCR_MIN_CONFIDENCE = 75.0
+LOCAL_OCR_MIN_LENGTH = 20
+
+# Number of remote OCR models (primary first) queried at once; the rest
+# (e.g. the image-captioning model) are only tried if all of these fail
+REMOTE_OCR_RACE_SIZE = 3
+
+# 1x1 white PNG posted to the primary model to trigger loading it ahead of real requests
+WARMUP_IMAGE = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAAAAAA6fptVAAAACklEQVR4nGP4DwABAQEAsTj2FAAAAABJRU5ErkJggg=="
+)
+
+# Longest side (in pixels) images are scaled down to before OCR; text stays
+# legible while upload size and Tesseract work shrink with the pixel count
+MAX_IMAGE_DIMENSION = 1600
+
+# Uploaded JPEG/PNG images under this size (and within MAX_IMAGE_DIMENSION)
+# are sent to OCR without re-encoding
+MAX_PASSTHROUGH_IMAGE_BYTES = 2 * 1024 * 1024
+
+# Larger estimated skews are more likely layout than a tilted photo, so they are not corrected
+MAX_DESKEW_ANGLE = 10.0
+
+# In-memory LRU cache of OCR results keyed by image content and model URL,
+# so Streamlit reruns and re-uploads of the same image skip OCR entirely
+OCR_CACHE_MAX_SIZE = 256
+
+# Results are also persisted on disk (when diskcache is installed) so they
+# survive app restarts
+OCR_DISK_CACHE_DIR = os.getenv('OCR_CACHE_DIR', os.path.expanduser(os.path.join('~', '.cache', 'studyai', 'ocr')))
+OCR_DISK_CACHE_EXPIRE = 30 * 86400  # seconds
+
+_OCR_CACHE = LRUDiskCache("OCR", OCR_CACHE_MAX_SIZE, OCR_DISK_CACHE_DIR, OCR_DISK_CACHE_EXPIRE)
+
+
+class PreparedImage(NamedTuple):
+    """An uploaded image ready for OCR."""
+    data: bytes  # Encoded image sent to the Hugging Face API and used as the cache key
+    gray: Optional[Any] = None  # Grayscale pixels, if already decoded, for local OCR
+
+
+# tesserocr API handle, created on first use; the API is not thread-safe
+_TESS_API = None
+_TESS_LOCK = threading.Lock()
+
+
+def _run_tesseract(binary: "np.ndarray") -> Tuple[str, List[float]]:
+    """
+    Run Tesseract on a preprocessed image as a single block of text.
+
+    Uses the in-process tesserocr API when installed, otherwise pytesseract.
+
+    Args:
+        binary: Binarized image
+
+    Returns:
+        Tuple of (text, per-word confidences 0-100)
+    """
+    global _TESS_API
+    if TESSEROCR_AVAILABLE:
+        with _TESS_LOCK:
+            if _TESS_API is None:
+                _TESS_API = tesserocr.PyTessBaseAPI(psm=tesserocr.PSM.SINGLE_BLOCK)
+            _TESS_API.SetImage(Image.fromarray(binary))
+            return _TESS_API.GetUTF8Text(), [float(conf) for conf in _TESS_API.AllWordConfidences()]
+
+    data = pytesseract.image_to_data(binary, config='--psm 6', output_type=pytesseract.Output.DICT)
+
+    # Rebuild the text line by line; conf is -1 for non-word boxes
+    lines = {}
+    confidences = []
+    for word, conf, block, par, line in zip(data['text'], data['conf'], data['block_num'],
+                                           data['par_num'], data['line_num']):
+        if float(conf) < 0 or not word.strip():
+            continue
+        lines.setdefault((block, par, line), []).append(word)
+        confidences.append(float(conf))
+    return '\n'.join(' '.join(words) for words in lines.values()), confidences
+
+
+def _run_local_ocr(image_data: bytes, gray: Optional["np.ndarray"] = None) -> Tuple[Optional[str], float]:
+    """
+    Decode, preprocess and OCR an image with Tesseract.
+
+    Kept at module level so it can run in a worker process.
+
+    Args:
+        image_data: Raw image data in bytes
+        gray: Already decoded grayscale pixels; image_data is decoded if omitted
+
+    Returns:
+        Tuple of (extracted text or None, mean word confidence 0-100)
+    """
+    if not LOCAL_OCR_AVAILABLE:
+        return None, 0.0
+
+    try:
+        if gray is None:
+            # Decode straight to grayscale, skipping the RGB/BGR intermediates
+            gray = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            # Formats OpenCV cannot decode (e.g. GIF) go through PIL
+            gray = np.array(Image.open(io.BytesIO(image_data)).convert('L'))
+
+        # High-resolution photos OCR just as well scaled down, and much faster
+        scale = min(1.0, MAX_IMAGE_DIMENSION / max(gray.shape))
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        thresh = _preprocess_for_ocr(gray)
+
+        # Use Tesseract to extract text with per-word confidence
+        text, confidences = _run_tesseract(thresh)
+
+        if text and len(text.strip()) > 0:
+            confidence = sum(confidences) / len(confidences) if confidences else 0.0
+            logger.info("Local OCR extracted text: %d characters (confidence %.0f)", len(text), confidence)
+            return text.strip(), confidence
+        else:
+            logger.warning("Local OCR found no text")
+            return None, 0.0
+
+    except Exception as e:
+        logger.warning("Local OCR failed: %s", e)
+        return None, 0.0
+
+
+def _preprocess_for_ocr(gray: "np.ndarray") -> "np.ndarray":
+    """
+    Binarize, denoise and deskew a grayscale image for Tesseract.
+
+    Adaptive thresholding copes with unevenly lit photos where a single
+    global (Otsu) threshold washes out parts of the page.
+
+    Args:
+        gray: Grayscale image
+
+    Returns:
+        Binary image with black text on a white background
+    """
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    thresh = cv2.adaptiveThreshold(
+        blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, blockSize=31, C=10
+    )
+
+    # Work on white-on-black so opening removes isolated specks of "ink"
+    ink = cv2.morphologyEx(cv2.bitwise_not(thresh), cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+
+    angle = _estimate_skew_angle(ink)
+    if 0.5 <= abs(angle) <= MAX_DESKEW_ANGLE:
+        height, width = ink.shape
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        ink = cv2.warpAffine(ink, matrix, (width, height), flags=cv2.INTER_NEAREST,
+                             borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+    return cv2.bitwise_not(ink)
+
+
+def _estimate_skew_angle(ink: "np.ndarray") -> float:
+    """
+    Estimate how far the text lines of a page are rotated.
+
+    Words are smeared horizontally into one blob per text line and the
+    median angle of those blobs is taken, so the placement of headings,
+    columns or ragged line ends does not affect the result.
+
+    Args:
+        ink: Binary image with white text on a black background
+
+    Returns:
+        Rotation in degrees (for cv2.getRotationMatrix2D) that levels the
+        text lines, or 0.0 if no text lines were found
+    """
+    height, width = ink.shape
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(9, width // 40), 3))
+    contours, _ = cv2.findContours(cv2.dilate(ink, kernel), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    angles = []
+    for contour in contours:
+        _, (rect_width, rect_height), angle = cv2.minAreaRect(contour)
+        # Measure along the long side, whichever side OpenCV reports first
+        if rect_width < rect_height:
+            rect_width, rect_height = rect_height, rect_width
+            angle -= 90
+        # Only long, thin blobs are text lines
+        if rect_width < max(40, width * 0.05) or rect_width < 5 * rect_height:
+            continue
+        # Normalize across OpenCV versions' angle conventions to [-45, 45]
+        while angle > 45:
+            angle -= 90
+        while angle < -45:
+            angle += 90
+        angles.append(angle)
+
+    return float(np.median(angles)) if angles else 0.0
+
+
+@functools.lru_cache(maxsize=1)
+def _get_ocr_process_pool() -> ProcessPoolExecutor:
+    """Get the worker process pool used to run Tesseract on several cores."""
+    return ProcessPoolExecutor(max_workers=os.cpu_count())
+
+
+def _loads_json(content: bytes) -> Any:
+    """Decode a JSON response body straight from bytes."""
+    return orjson.loads(content) if ORJSON_AVAILABLE else json.loads(content)
+
+
+def _image_fingerprint(image_data: bytes) -> bytes:
+    """
+    Hash image content for cache lookups and duplicate detection.
+
+    This is not a cryptographic hash when xxhash is used; it only needs to
+    tell different images apart, and XXH3 is many times faster than
+    SHA-256 on multi-megabyte images. BLAKE2b is the fallback.
+    """
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_128_digest(image_data)
+    return hashlib.blake2b(image_data, digest_size=16).digest()
+
+
+def _ocr_cache_key(image_data: bytes, api_url: str) -> str:
+    """Build the OCR cache key for an image and primary model."""
+    return f"{_image_fingerprint(image_data).hex()}|{api_url}"
+
+
 class ImageToTextProcessor:
     """Handles image to text conversion using Hugging Face API."""
     
@@ -65,48 +335,381 @@ class ImageToTextProcessor:
             "microsoft/trocr-base-handwritten",
             "nlpconnect/vit-gpt2-image-captioning"  # Last resort for image description
         ]
+
+        # Reuse pooled connections across models and images instead of a
+        # fresh TCP+TLS handshake per request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=2,
+                backoff_factor=0.3,
+                status_forcelist=[503],
+                allowed_methods=frozenset({"POST"}),
+                raise_on_status=False
+            )
+        )
+        self.session.mount("https://", adapter)
+        self.session.headers.update(self.headers)
+        self.session.headers["Accept"] = "application/json"
+
+        # How often local OCR was good enough vs. escalated to remote models
+        self.ocr_stats = {"local": 0, "escalated": 0}
+
+        self._warmup_started = False
+        self._warmup_lock = threading.Lock()
+
+    def close(self):
+        """Close pooled HTTP connections."""
+        self.session.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
         
     def is_available(self) -> bool:
         """Check if the image-to-text service is available."""
         return bool(self.api_token)
+
+    def warm_up(self):
+        """
+        Ask the Hugging Face API to load the primary model in the background.
+
+        Cold models answer 503 for up to tens of seconds; sending a tiny
+        image while the user is still choosing files hides that delay. Only
+        the first call per processor does anything.
+        """
+        if not self.is_available():
+            return
+
+        with self._warmup_lock:
+            if self._warmup_started:
+                return
+            self._warmup_started = True
+
+        def _warm():
+            try:
+                # Ask the API to hold the request until the model has loaded
+                self.session.post(self.api_url, data=WARMUP_IMAGE, timeout=60,
+                                  headers={"x-wait-for-model": "true"})
+                logger.info("OCR model warm-up request completed")
+            except Exception as e:
+                logger.warning("OCR model warm-up failed: %s", e)
+
+        threading.Thread(target=_warm, name="ocr-model-warmup", daemon=True).start()
     
-    def process_image(self, image_data: bytes) -> Optional[str]:
+    def process_image(self, image_data: bytes, use_cache: bool = True,
+                      gray: Optional["np.ndarray"] = None) -> Optional[str]:
         """
         Convert image to text using Hugging Face OCR API with fallback models.
 
         Args:
             image_data: Raw image data in bytes
+            use_cache: Whether to reuse results for previously seen images
+            gray: Already decoded grayscale pixels of the image, if available
 
         Returns:
             Extracted text or None if failed
         """
-        if not self.is_available():
-            logger.error("Hugging Face API token not available")
+        if not image_data:
             return None
 
-        # Try primary OCR model first
-        result = self._try_model(self.api_url, image_data)
+        if not use_cache:
+            return self._run_ocr(image_data, gray)
+
+        key = _ocr_cache_key(image_data, self.api_url)
+        cached = _OCR_CACHE.get(key)
+        if cached is not None:
+            logger.info("Using cached OCR result")
+            return cached
+
+        result = self._run_ocr(image_data, gray)
         if result:
-            return result
+            _OCR_CACHE.put(key, result)
+        return result
+
+    def _run_ocr(self, image_data: bytes, gray: Optional["np.ndarray"] = None) -> Optional[str]:
+        """
+        Run the OCR ladder on an image, cheapest stage first.
+
+        Local Tesseract runs first; the Hugging Face models are only tried
+        when its confidence is low or it finds too little text.
+
+        Args:
+            image_data: Raw image data in bytes
+            gray: Already decoded grayscale pixels of the image, if available
+
+        Returns:
+            Extracted text or None if failed
+        """
+        # Stage 1: local OCR
+        local_text = None
+        if LOCAL_OCR_AVAILABLE:
+            local_text, confidence = self._try_local_ocr(image_data, gray)
+            if self._is_confident(local_text, confidence):
+                self._record_ocr_stage(escalated=False)
+                return local_text
 
-        # Try fallback models
-        for model_name in self.fallback_models:
-            fallback_url = f"https://api-inference.huggingface.co/models/{model_name}"
-            logger.info(f"Trying fallback model: {model_name}")
-            result = self._try_model(fallback_url, image_data)
+        # Stage 2: race the OCR models, then fall back to the rest in order
+        if self.is_available():
+            self._record_ocr_stage(escalated=True)
+            model_urls = self._model_urls()
+            result = self._race_models(model_urls[:REMOTE_OCR_RACE_SIZE], image_data)
             if result:
                 return result
+            for api_url in model_urls[REMOTE_OCR_RACE_SIZE:]:
+                logger.info("Trying fallback model: %s", api_url)
+                result = self._try_model(api_url, image_data)
+                if result:
+                    return result
+        elif not LOCAL_OCR_AVAILABLE:
+            logger.error("Hugging Face API token not available")
+            return None
+
+        # Low-confidence local text beats nothing
+        if local_text:
+            return local_text
+
+        logger.error("All OCR methods failed to extract text")
+        return None
+
+    def _model_urls(self) -> List[str]:
+        """Get the API URLs of the primary and fallback models, in order."""
+        return [self.api_url] + [
+            f"https://api-inference.huggingface.co/models/{model_name}"
+            for model_name in self.fallback_models
+        ]
+
+    def _race_models(self, api_urls: List[str], image_data: bytes) -> Optional[str]:
+        """
+        Query several models at once and return the first text extracted.
+
+        A model that is still loading (503) or times out no longer delays the
+        others; requests still in flight when one succeeds are abandoned.
+
+        Args:
+            api_urls: API endpoint URLs to query concurrently
+            image_data: Raw image data in bytes
+
+        Returns:
+            Extracted text or None if every model failed
+        """
+        executor = ThreadPoolExecutor(max_workers=len(api_urls))
+        futures = [executor.submit(self._try_model, api_url, image_data) for api_url in api_urls]
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                if result:
+                    return result
+            return None
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _race_models_async(self, session: "aiohttp.ClientSession", api_urls: List[str],
+                                 image_data: bytes) -> Optional[str]:
+        """
+        Async counterpart of _race_models; losing requests are cancelled.
+
+        Args:
+            session: Shared aiohttp session
+            api_urls: API endpoint URLs to query concurrently
+            image_data: Raw image data in bytes
+
+        Returns:
+            Extracted text or None if every model failed
+        """
+        tasks = [asyncio.create_task(self._try_model_async(session, api_url, image_data)) for api_url in api_urls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result:
+                    return result
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _is_confident(self, text: Optional[str], confidence: float) -> bool:
+        """Check whether a local OCR result is good enough to skip remote models."""
+        return bool(text) and len(text) > LOCAL_OCR_MIN_LENGTH and confidence > LOCAL_OCR_MIN_CONFIDENCE
+
+    def _record_ocr_stage(self, escalated: bool):
+        """Track how many images needed the remote models."""
+        self.ocr_stats["escalated" if escalated else "local"] += 1
+        total = self.ocr_stats["local"] + self.ocr_stats["escalated"]
+        logger.info("OCR escalated to remote models for %d/%d images", self.ocr_stats['escalated'], total)
+
+    async def process_images_batch(self, images: List[Union[bytes, PreparedImage, None]],
+                                   use_cache: bool = True) -> List[Optional[str]]:
+        """
+        Convert several images to text concurrently.
 
-        # Try local OCR as last resort
+        Requests to the Hugging Face API are issued in parallel over one
+        aiohttp session, so a batch takes roughly one round-trip instead of
+        one per image.
+
+        Args:
+            images: Raw image data or prepared images, in any mix
+            use_cache: Whether to reuse results for previously seen images
+
+        Returns:
+            Extracted text (or None) for each image, in the same order
+        """
+        images = [PreparedImage(image) if isinstance(image, bytes) else image for image in images]
+
+        if not AIOHTTP_AVAILABLE:
+            # Run the blocking pipeline for each image in its own thread
+            return await asyncio.gather(*[
+                asyncio.to_thread(self.process_image, image.data if image else None, use_cache,
+                                  image.gray if image else None)
+                for image in images
+            ])
+
+        async with aiohttp.ClientSession(headers={**self.headers, "Accept": "application/json"}) as session:
+            return await asyncio.gather(*[
+                self._process_one_async(session, image, use_cache) for image in images
+            ])
+
+    async def _process_one_async(self, session: "aiohttp.ClientSession", image: Optional[PreparedImage],
+                                 use_cache: bool = True) -> Optional[str]:
+        """
+        Async counterpart of process_image for use within a batch.
+
+        Args:
+            session: Shared aiohttp session
+            image: Prepared image
+            use_cache: Whether to reuse results for previously seen images
+
+        Returns:
+            Extracted text or None if failed
+        """
+        if not image or not image.data:
+            return None
+
+        image_data = image.data
+        if not use_cache:
+            return await self._run_ocr_async(session, image_data, image.gray)
+
+        key = _ocr_cache_key(image_data, self.api_url)
+        cached = _OCR_CACHE.get(key)
+        if cached is not None:
+            logger.info("Using cached OCR result")
+            return cached
+
+        result = await self._run_ocr_async(session, image_data, image.gray)
+        if result:
+            _OCR_CACHE.put(key, result)
+        return result
+
+    async def _run_ocr_async(self, session: "aiohttp.ClientSession", image_data: bytes,
+                             gray: Optional["np.ndarray"] = None) -> Optional[str]:
+        """
+        Async counterpart of _run_ocr.
+
+        Args:
+            session: Shared aiohttp session
+            image_data: Raw image data in bytes
+            gray: Already decoded grayscale pixels of the image, if available
+
+        Returns:
+            Extracted text or None if failed
+        """
+        # Stage 1: local OCR
+        local_text = None
         if LOCAL_OCR_AVAILABLE:
-            logger.info("Trying local OCR with Tesseract")
-            result = self._try_local_ocr(image_data)
+            local_text, confidence = await self._try_local_ocr_async(image_data, gray)
+            if self._is_confident(local_text, confidence):
+                self._record_ocr_stage(escalated=False)
+                return local_text
+
+        # Stage 2: race the OCR models, then fall back to the rest in order
+        if self.is_available():
+            self._record_ocr_stage(escalated=True)
+            model_urls = self._model_urls()
+            result = await self._race_models_async(session, model_urls[:REMOTE_OCR_RACE_SIZE], image_data)
             if result:
                 return result
+            for api_url in model_urls[REMOTE_OCR_RACE_SIZE:]:
+                logger.info("Trying fallback model: %s", api_url)
+                result = await self._try_model_async(session, api_url, image_data)
+                if result:
+                    return result
+        elif not LOCAL_OCR_AVAILABLE:
+            logger.error("Hugging Face API token not available")
+            return None
+
+        # Low-confidence local text beats nothing
+        if local_text:
+            return local_text
 
         logger.error("All OCR methods failed to extract text")
         return None
 
+    def _extract_text(self, result: Any) -> Optional[str]:
+        """
+        Pull the generated text out of a Hugging Face API response.
+
+        Args:
+            result: Decoded JSON response
+
+        Returns:
+            Extracted text or None if the response has no text
+        """
+        # Handle different response formats
+        if isinstance(result, list) and len(result) > 0:
+            # OCR models typically return generated_text
+            text = result[0].get('generated_text', '')
+            if text and len(text.strip()) > 0:
+                logger.info("Successfully extracted text: %d characters", len(text))
+                return text.strip()
+        elif isinstance(result, dict):
+            # Some models might return different format
+            text = result.get('generated_text', result.get('text', ''))
+            if text and len(text.strip()) > 0:
+                logger.info("Successfully extracted text: %d characters", len(text))
+                return text.strip()
+
+        logger.warning("No text found in API response")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Unrecognised API response payload: %r", result)
+        return None
+
+    async def _try_model_async(self, session: "aiohttp.ClientSession", api_url: str, image_data: bytes) -> Optional[str]:
+        """
+        Try a specific model for text extraction without blocking.
+
+        Args:
+            session: Shared aiohttp session
+            api_url: API endpoint URL
+            image_data: Raw image data in bytes
+
+        Returns:
+            Extracted text or None if failed
+        """
+        try:
+            async with session.post(api_url, data=image_data, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                if response.status == 200:
+                    return self._extract_text(_loads_json(await response.read()))
+                elif response.status == 503:
+                    logger.warning("Model is loading, this might take a few minutes")
+                    return None
+                else:
+                    logger.warning("API request failed with status %s: %s", response.status, await response.text())
+                    return None
+
+        except asyncio.TimeoutError:
+            logger.warning("API request timed out")
+            return None
+        except aiohttp.ClientError as e:
+            logger.warning("API request failed: %s", e)
+            return None
+        except Exception as e:
+            logger.warning("Error during model processing: %s", e)
+            return None
+
     def _try_model(self, api_url: str, image_data: bytes) -> Optional[str]:
         """
         Try a specific model for text extraction.
@@ -120,132 +723,156 @@ class ImageToTextProcessor:
         """
         try:
             # Make API request
-            response = requests.post(
+            response = self.session.post(
                 api_url,
-                headers=self.headers,
                 data=image_data,
                 timeout=30
             )
 
             if response.status_code == 200:
-                result = response.json()
-
-                # Handle different response formats
-                if isinstance(result, list) and len(result) > 0:
-                    # OCR models typically return generated_text
-                    text = result[0].get('generated_text', '')
-                    if text and len(text.strip()) > 0:
-                        logger.info(f"Successfully extracted text: {len(text)} characters")
-                        return text.strip()
-                elif isinstance(result, dict):
-                    # Some models might return different format
-                    text = result.get('generated_text', result.get('text', ''))
-                    if text and len(text.strip()) > 0:
-                        logger.info(f"Successfully extracted text: {len(text)} characters")
-                        return text.strip()
-
-                logger.warning(f"No text found in API response: {result}")
-                return None
+                return self._extract_text(_loads_json(response.content))
             elif response.status_code == 503:
                 logger.warning("Model is loading, this might take a few minutes")
                 return None
             else:
-                logger.warning(f"API request failed with status {response.status_code}: {response.text}")
+                logger.warning("API request failed with status %s: %s", response.status_code, response.text)
                 return None
 
         except requests.exceptions.Timeout:
             logger.warning("API request timed out")
             return None
         except requests.exceptions.RequestException as e:
-            logger.warning(f"API request failed: {e}")
+            logger.warning("API request failed: %s", e)
             return None
         except Exception as e:
-            logger.warning(f"Error during model processing: {e}")
+            logger.warning("Error during model processing: %s", e)
             return None
 
-    def _try_local_ocr(self, image_data: bytes) -> Optional[str]:
+    async def _try_local_ocr_async(self, image_data: bytes,
+                                   gray: Optional["np.ndarray"] = None) -> Tuple[Optional[str], float]:
         """
-        Try local OCR using Tesseract as fallback.
+        Run local OCR in the worker process pool so a batch uses every core.
 
         Args:
             image_data: Raw image data in bytes
+            gray: Already decoded grayscale pixels; image_data is decoded if omitted
 
         Returns:
-            Extracted text or None if failed
+            Tuple of (extracted text or None, mean word confidence 0-100)
         """
-        if not LOCAL_OCR_AVAILABLE:
-            return None
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(_get_ocr_process_pool(), _run_local_ocr, image_data, gray)
+        except BrokenProcessPool as e:
+            logger.warning("OCR process pool unavailable, running in a thread: %s", e)
+            _get_ocr_process_pool.cache_clear()
+            return await asyncio.to_thread(_run_local_ocr, image_data, gray)
+
+    def _try_local_ocr(self, image_data: bytes, gray: Optional["np.ndarray"] = None) -> Tuple[Optional[str], float]:
+        """
+        Try local OCR using Tesseract.
 
+        Args:
+            image_data: Raw image data in bytes
+            gray: Already decoded grayscale pixels; image_data is decoded if omitted
+
+        Returns:
+            Tuple of (extracted text or None, mean word confidence 0-100)
+        """
+        return _run_local_ocr(image_data, gray)
+
+    def prepare_image(self, image_data: bytes) -> Optional[PreparedImage]:
+        """
+        Validate raw image bytes and normalize them for OCR.
+        
+        Images that are already small JPEGs or PNGs are passed through as-is;
+        anything else is downscaled if needed and losslessly re-encoded as PNG,
+        since lossy JPEG artifacts around text edges hurt OCR accuracy. When
+        the image has to be decoded here, its grayscale pixels are kept so
+        local OCR does not decode the re-encoded bytes again.
+        
+        Args:
+            image_data: Raw image data in bytes
+            
+        Returns:
+            PreparedImage or None if the image is invalid
+        """
         try:
-            # Convert bytes to PIL Image
             image = Image.open(io.BytesIO(image_data))
-
+            
+            if (image.format in ('JPEG', 'PNG') and len(image_data) < MAX_PASSTHROUGH_IMAGE_BYTES
+                    and max(image.size) <= MAX_IMAGE_DIMENSION):
+                return PreparedImage(image_data)
+            
             # Convert to RGB if necessary
             if image.mode != 'RGB':
                 image = image.convert('RGB')
-
-            # Convert PIL Image to OpenCV format
-            opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-
-            # Preprocess image for better OCR
-            gray = cv2.cvtColor(opencv_image, cv2.COLOR_BGR2GRAY)
-
-            # Apply threshold to get better contrast
-            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-            # Use Tesseract to extract text
-            text = pytesseract.image_to_string(thresh, config='--psm 6')
-
-            if text and len(text.strip()) > 0:
-                logger.info(f"Local OCR extracted text: {len(text)} characters")
-                return text.strip()
-            else:
-                logger.warning("Local OCR found no text")
-                return None
-
+            
+            # Cap the size sent to OCR (the HF API limits request size)
+            image.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION), Image.LANCZOS)
+            
+            # Convert back to bytes with the fastest lossless encoding
+            img_byte_arr = io.BytesIO()
+            image.save(img_byte_arr, format='PNG', optimize=False, compress_level=1)
+            gray = np.asarray(image.convert('L')) if LOCAL_OCR_AVAILABLE else None
+            return PreparedImage(img_byte_arr.getvalue(), gray)
+            
         except Exception as e:
-            logger.warning(f"Local OCR failed: {e}")
+            logger.error("Error processing image format: %s", e)
             return None
     
-    def process_image_file(self, uploaded_file) -> Optional[str]:
+    def prepare_image_data(self, image_data: bytes) -> Optional[bytes]:
         """
-        Process an uploaded image file.
+        Validate raw image bytes and normalize them for OCR.
         
         Args:
-            uploaded_file: Streamlit uploaded file object
+            image_data: Raw image data in bytes
+            
+        Returns:
+            Normalized image bytes or None if the image is invalid
+        """
+        image = self.prepare_image(image_data)
+        return image.data if image else None
+    
+    def process_image_bytes(self, image_data: bytes) -> Optional[str]:
+        """
+        Validate, normalize and extract text from raw uploaded image bytes.
+        
+        Args:
+            image_data: Raw image data as uploaded
             
         Returns:
             Extracted text or None if failed
         """
         try:
-            # Read the image data
-            image_data = uploaded_file.getvalue()
-            
-            # Validate image format
-            try:
-                image = Image.open(io.BytesIO(image_data))
-                # Convert to RGB if necessary
-                if image.mode != 'RGB':
-                    image = image.convert('RGB')
-                
-                # Convert back to bytes
-                img_byte_arr = io.BytesIO()
-                image.save(img_byte_arr, format='JPEG')
-                image_data = img_byte_arr.getvalue()
-                
-            except Exception as e:
-                logger.error(f"Error processing image format: {e}")
+            image = self.prepare_image(image_data)
+            if image is None:
                 return None
             
             # Process the image
-            return self.process_image(image_data)
+            return self.process_image(image.data, gray=image.gray)
             
         except Exception as e:
-            logger.error(f"Error processing uploaded file: {e}")
+            logger.error("Error processing uploaded file: %s", e)
             return None
+    
+    def process_image_file(self, uploaded_file) -> Optional[str]:
+        """
+        Process an uploaded image file.
+        
+        Prefer process_image_bytes when the file's bytes have already been read.
+        
+        Args:
+            uploaded_file: Streamlit uploaded file object
+            
+        Returns:
+            Extracted text or None if failed
+        """
+        return self.process_image_bytes(uploaded_file.getvalue())
 
+@st.cache_resource
 def get_image_processor() -> ImageToTextProcessor:
-    """Get a configured ImageToTextProcessor instance."""
+    """Get the shared ImageToTextProcessor, kept across Streamlit reruns."""
     return ImageToTextProcessor()
 
 def handle_image_upload():
@@ -261,6 +888,7 @@ def handle_image_upload():
 
     with col1:
         if processor.is_available():
+            processor.warm_up()
             st.success("✅ Hugging Face OCR API ready")
         else:
             st.warning("⚠️ Hugging Face API not configured")
@@ -291,9 +919,11 @@ def handle_image_upload():
     if uploaded_files:
         st.write(f"📁 **{len(uploaded_files)} image(s) selected:**")
         
-        for i, uploaded_file in enumerate(uploaded_files):
-            file_size = len(uploaded_file.getvalue()) if hasattr(uploaded_file, 'getvalue') else 0
-            st.write(f"   {i+1}. {uploaded_file.name} ({file_size:,} bytes)")
+        # Read each file once; the listing and the OCR below reuse the bytes
+        file_bytes = [f.getvalue() if hasattr(f, 'getvalue') else b'' for f in uploaded_files]
+        
+        for i, (uploaded_file, image_bytes) in enumerate(zip(uploaded_files, file_bytes)):
+            st.write(f"   {i+1}. {uploaded_file.name} ({len(image_bytes):,} bytes)")
         
         if st.button("🔍 Extract Text from Images", type="primary"):
             progress_bar = st.progress(0)
@@ -301,20 +931,36 @@ def handle_image_upload():
             
             all_extracted_text = []
             
-            for i, uploaded_file in enumerate(uploaded_files):
-                status_text.text(f"Processing {uploaded_file.name}...")
-                progress_bar.progress((i + 1) / len(uploaded_files))
-                
-                # Display the image
-                col1, col2 = st.columns([1, 2])
-                
-                with col1:
-                    st.image(uploaded_file, caption=uploaded_file.name, width=200)
-                
-                with col2:
-                    with st.spinner(f"Extracting text from {uploaded_file.name}..."):
-                        extracted_text = processor.process_image_file(uploaded_file)
-                        
+            # Reserve one slot per image up front; each is filled in a single pass below
+            results_container = st.container()
+            placeholders = [results_container.empty() for _ in uploaded_files]
+            
+            # Extract text from all images concurrently
+            status_text.text(f"Extracting text from {len(uploaded_files)} image(s)...")
+            with st.spinner("Extracting text from images..."):
+                # OCR each distinct image once, even if it was uploaded several times
+                unique_images = {}
+                image_hashes = []
+                for image_bytes in file_bytes:
+                    image_hash = _image_fingerprint(image_bytes)
+                    unique_images.setdefault(image_hash, image_bytes)
+                    image_hashes.append(image_hash)
+
+                images = [processor.prepare_image(image_bytes) for image_bytes in unique_images.values()]
+                texts = asyncio.run(processor.process_images_batch(images))
+                text_by_hash = dict(zip(unique_images.keys(), texts))
+                results = [text_by_hash[image_hash] for image_hash in image_hashes]
+            
+            status_text.text("Rendering results...")
+            for i, (uploaded_file, extracted_text) in enumerate(zip(uploaded_files, results)):
+                with placeholders[i].container():
+                    # Display the image
+                    col1, col2 = st.columns([1, 2])
+                    
+                    with col1:
+                        st.image(uploaded_file, caption=uploaded_file.name, width=200)
+                    
+                    with col2:
                         if extracted_text:
                             st.success(f"✅ Text extracted successfully!")
 
@@ -337,8 +983,8 @@ def handle_image_upload():
                             st.write("• Make sure text is clearly visible")
                             st.write("• Try images with printed text rather than handwritten")
                             st.write("• Higher resolution images work better")
-                
-                st.divider()
+                    
+                    st.divider()
             
             # Summary
             if all_extracted_text:
@@ -7,15 +7,18 @@ Provides beautiful login and registration interfaces
 import streamlit as st
 from auth import auth_manager
 import re
+import time
+import functools
 
-def validate_email(email: str) -> bool:
-    """Validate email format."""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+# Compiled once at import; validate_email runs on every form submission.
+# Dots must separate non-empty parts, so "a..b@x.co", ".a@x.co" and
+# "a@x..co" are rejected.
+_EMAIL_RE = re.compile(
+    r'^[a-zA-Z0-9_%+-]+(?:\.[a-zA-Z0-9_%+-]+)*@[a-zA-Z0-9-]+(?:\.[a-zA-Z0-9-]+)*\.[a-zA-Z]{2,}$'
+)
 
-def render_login_styles():
-    """Render CSS styles for login components."""
-    st.markdown("""
+# Static markup shared by every rerun of the auth pages
+_LOGIN_CSS_HTML = """
     <style>
     /* Login Container Styles */
     .login-container {
@@ -122,16 +125,63 @@ def render_login_styles():
         font-size: 0.9rem;
     }
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+
+# Successful session checks are trusted for this many seconds of reruns
+AUTH_RECHECK_SECONDS = 5.0
+
+_LOGIN_CONTAINER_OPEN = '<div class="login-container">'
+_LOGIN_CONTAINER_CLOSE = '</div>'
+
+# Fragments (Streamlit >= 1.33) rerun only the form that changed; older
+# releases fall back to rendering the whole page as before.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_validate_session(session_token: str):
+    """Validate a session token, reusing the answer for 30 seconds of reruns."""
+    return auth_manager.validate_session(session_token)
+
+@functools.lru_cache(maxsize=8)
+def _header_html(title: str, subtitle: str) -> str:
+    """Build the markup for a login-page header."""
+    return f'<div class="login-header"><h2>{title}</h2><p>{subtitle}</p></div>'
+
+def render_header(title: str, subtitle: str):
+    """Render a login-page header with a title and subtitle."""
+    st.markdown(_header_html(title, subtitle), unsafe_allow_html=True)
+
+def validate_email(email: str) -> bool:
+    """Validate email format."""
+    # Cheap string checks reject most partial input before the regex runs
+    if not email or len(email) < 5 or '@' not in email:
+        return False
+    if '.' not in email.rsplit('@', 1)[-1] or any(c.isspace() for c in email):
+        return False
+    return _EMAIL_RE.match(email) is not None
 
+# (predicate, message) pairs checked against the registration form fields:
+# (username, email, password, confirm_password, agree_terms). text_input
+# always returns a str, so the length checks also cover empty fields.
+_REGISTRATION_RULES = (
+    (lambda u, e, p, c, t: len(u) >= 3, "Username must be at least 3 characters long"),
+    (lambda u, e, p, c, t: validate_email(e), "Please enter a valid email address"),
+    (lambda u, e, p, c, t: len(p) >= 6, "Password must be at least 6 characters long"),
+    (lambda u, e, p, c, t: p == c, "Passwords do not match"),
+    (lambda u, e, p, c, t: t, "You must agree to the Terms of Service"),
+)
+
+def render_login_styles():
+    """Render CSS styles for login components."""
+    # Streamlit drops elements that are not re-emitted on a rerun, so the
+    # stylesheet is sent every time; only the string itself is prebuilt.
+    st.markdown(_LOGIN_CSS_HTML, unsafe_allow_html=True)
+
+@_fragment
 def render_login_form():
     """Render the login form."""
-    st.markdown("""
-    <div class="login-header">
-        <h2>🔐 Sign In</h2>
-        <p>Welcome back to StudyMate!</p>
-    </div>
-    """, unsafe_allow_html=True)
+    render_header("🔐 Sign In", "Welcome back to StudyMate!")
     
     with st.form("login_form", clear_on_submit=False):
         username_or_email = st.text_input(
@@ -178,14 +228,10 @@ def render_login_form():
     
     return False
 
+@_fragment
 def render_registration_form():
     """Render the registration form."""
-    st.markdown("""
-    <div class="login-header">
-        <h2>📝 Create Account</h2>
-        <p>Join StudyMate and supercharge your learning!</p>
-    </div>
-    """, unsafe_allow_html=True)
+    render_header("📝 Create Account", "Join StudyMate and supercharge your learning!")
     
     with st.form("registration_form", clear_on_submit=False):
         col1, col2 = st.columns(2)
@@ -238,26 +284,12 @@ def render_registration_form():
         
         if register_button:
             # Validation
-            errors = []
-            
-            if not username or len(username) < 3:
-                errors.append("Username must be at least 3 characters long")
-            
-            if not email or not validate_email(email):
-                errors.append("Please enter a valid email address")
-            
-            if not password or len(password) < 6:
-                errors.append("Password must be at least 6 characters long")
-            
-            if password != confirm_password:
-                errors.append("Passwords do not match")
-            
-            if not agree_terms:
-                errors.append("You must agree to the Terms of Service")
+            fields = (username, email, password, confirm_password, agree_terms)
+            errors = [message for rule, message in _REGISTRATION_RULES if not rule(*fields)]
             
             if errors:
-                for error in errors:
-                    st.error(f"❌ {error}")
+                # One element for all messages instead of one per error
+                st.error("❌ " + "\n\n❌ ".join(errors))
                 return False
             
             # Attempt registration
@@ -276,10 +308,11 @@ def render_user_profile():
     """Render user profile section."""
     user_data = st.session_state.get('user_data', {})
     
-    # User profile card
-    avatar_letter = user_data.get('username', 'U')[0].upper()
-    
-    st.markdown(f"""
+    # User profile card, rebuilt only when the displayed fields change
+    profile_key = (user_data.get('username'), user_data.get('full_name'), user_data.get('email'))
+    if st.session_state.get('_profile_html_key') != profile_key:
+        avatar_letter = user_data.get('username', 'U')[0].upper()
+        st.session_state['_profile_html'] = f"""
     <div class="user-profile">
         <div class="user-avatar">{avatar_letter}</div>
         <div class="user-info">
@@ -287,7 +320,10 @@ def render_user_profile():
             <p>📧 {user_data.get('email', 'No email')}</p>
         </div>
     </div>
-    """, unsafe_allow_html=True)
+    """
+        st.session_state['_profile_html_key'] = profile_key
+    
+    st.markdown(st.session_state['_profile_html'], unsafe_allow_html=True)
     
     # Quick actions
     col1, col2, col3 = st.columns(3)
@@ -314,7 +350,7 @@ def render_auth_interface():
         return True
     
     # Authentication interface
-    st.markdown('<div class="login-container">', unsafe_allow_html=True)
+    st.markdown(_LOGIN_CONTAINER_OPEN, unsafe_allow_html=True)
     
     # Tab selection
     if 'auth_tab' not in st.session_state:
@@ -338,7 +374,7 @@ def render_auth_interface():
     else:
         render_registration_form()
     
-    st.markdown('</div>', unsafe_allow_html=True)
+    st.markdown(_LOGIN_CONTAINER_CLOSE, unsafe_allow_html=True)
     
     return False
 
@@ -347,11 +383,11 @@ def logout_user():
     session_token = st.session_state.get('session_token')
     if session_token:
         auth_manager.logout_user(session_token)
+    _cached_validate_session.clear()
     
     # Clear session state
-    for key in ['authenticated', 'user_data', 'session_token']:
-        if key in st.session_state:
-            del st.session_state[key]
+    for key in ('authenticated', 'user_data', 'session_token', '_auth_checked_token', '_auth_checked_at'):
+        st.session_state.pop(key, None)
     
     st.success("✅ You have been logged out successfully!")
     st.rerun()
@@ -470,8 +506,14 @@ def check_authentication():
     if not session_token:
         return False
 
+    # Back-to-back reruns reuse this session's last successful check
+    now = time.monotonic()
+    if (st.session_state.get('_auth_checked_token') == session_token
+            and now - st.session_state.get('_auth_checked_at', 0.0) < AUTH_RECHECK_SECONDS):
+        return True
+
     # Validate session
-    is_valid, user_data = auth_manager.validate_session(session_token)
+    is_valid, user_data = _cached_validate_session(session_token)
 
     if not is_valid:
         # Session expired or invalid
@@ -480,4 +522,6 @@ def check_authentication():
 
     # Update user data
     st.session_state.user_data = user_data
+    st.session_state['_auth_checked_token'] = session_token
+    st.session_state['_auth_checked_at'] = now
     return True
@@ -5,15 +5,16 @@ Provides integration with OpenAI's ChatGPT models (GPT-4, GPT-3.5-turbo)
 
 import os
 import logging
-from typing import Dict, Any, Optional
+import threading
+import functools
+import importlib.util
+from typing import Dict, Any, Optional, Iterator
 from dataclasses import dataclass
 
-try:
-    import openai
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+# The openai SDK is heavy to import, so only check that it is installed here
+# and import it the first time a client is actually created
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
+if not OPENAI_AVAILABLE:
     logging.warning("OpenAI library not installed. Install with: pip install openai")
 
 # Configure logging
@@ -21,6 +22,28 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=None)
+def _lazy_openai():
+    """Import and return the OpenAI client class on first use."""
+    from openai import OpenAI
+    return OpenAI
+
+
+def _build_http_client():
+    """Build a pooled keep-alive HTTP client for the OpenAI SDK, preferring HTTP/2 when h2 is installed."""
+    import httpx  # Installed with the openai SDK
+
+    client_options = {
+        "limits": httpx.Limits(max_connections=40, max_keepalive_connections=20),
+        "timeout": httpx.Timeout(30.0, connect=5.0)
+    }
+    try:
+        return httpx.Client(http2=True, **client_options)
+    except ImportError:
+        logger.info("h2 package not installed, using HTTP/1.1 for OpenAI API")
+        return httpx.Client(**client_options)
+
+
 @dataclass
 class OpenAIConfig:
     """Configuration for OpenAI client."""
@@ -29,6 +52,7 @@ class OpenAIConfig:
     max_tokens: int = 500
     temperature: float = 0.7
     organization: Optional[str] = None
+    validate_on_init: bool = False  # Send a probe request while constructing the client
 
 
 class OpenAIClient:
@@ -47,16 +71,21 @@ class OpenAIClient:
         self.config = config
         self.client = None
         self.model_name = config.model
+        self.healthy: Optional[bool] = None  # Unknown until the first request or ping()
+        self._system_msg = {"role": "system", "content": "You are a helpful academic assistant."}
         
         try:
             # Initialize OpenAI client
-            self.client = OpenAI(
+            self.client = _lazy_openai()(
                 api_key=config.api_key,
-                organization=config.organization
+                organization=config.organization,
+                http_client=_build_http_client()
             )
             
-            # Test the connection
-            self._test_connection()
+            # Only probe the API when explicitly requested; otherwise the
+            # first real request doubles as the health check
+            if config.validate_on_init:
+                self._test_connection()
             logger.info(f"OpenAI client initialized successfully with model: {self.model_name}")
             
         except Exception as e:
@@ -72,6 +101,7 @@ class OpenAIClient:
                 messages=[{"role": "user", "content": "Hello"}],
                 max_tokens=5
             )
+            self.healthy = True
             logger.info("OpenAI connection test successful")
         except Exception as e:
             error_str = str(e)
@@ -80,9 +110,23 @@ class OpenAIClient:
                 # Don't raise for quota errors - client can still be used later
                 return
             else:
+                self.healthy = False
                 logger.error(f"OpenAI connection test failed: {error_str}")
                 raise
     
+    def ping(self) -> bool:
+        """
+        Explicitly check that the OpenAI API is reachable (e.g. for a health endpoint).
+        
+        Returns:
+            bool: True if the API responded, False otherwise
+        """
+        try:
+            self._test_connection()
+            return self.healthy is not False
+        except Exception:
+            return False
+    
     def generate_response(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """
         Generate response using OpenAI ChatGPT.
@@ -102,13 +146,11 @@ class OpenAIClient:
             # Create chat completion
             response = self.client.chat.completions.create(
                 model=self.config.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful academic assistant."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=[self._system_msg, {"role": "user", "content": prompt}],
                 max_tokens=max_tokens,
                 temperature=temperature
             )
+            self.healthy = True
             
             # Extract response text
             response_text = response.choices[0].message.content
@@ -126,6 +168,7 @@ class OpenAIClient:
             }
             
         except Exception as e:
+            self.healthy = False
             logger.error(f"Error generating OpenAI response: {str(e)}")
             return {
                 "success": False,
@@ -133,6 +176,75 @@ class OpenAIClient:
                 "response": "Sorry, I encountered an error while processing your request."
             }
     
+    def generate_response_stream(self, prompt: str, result: Optional[Dict[str, Any]] = None,
+                                 **kwargs) -> Iterator[str]:
+        """
+        Stream a response from OpenAI ChatGPT as it is generated.
+        
+        Args:
+            prompt: The input prompt
+            result: Optional dict that is filled with the same fields as
+                generate_response() once the stream finishes
+            **kwargs: Additional parameters (max_tokens, temperature, etc.)
+            
+        Yields:
+            str: Text fragments in the order they arrive
+        """
+        if result is None:
+            result = {}
+        parts = []
+        
+        try:
+            max_tokens = kwargs.get('max_tokens', self.config.max_tokens)
+            temperature = kwargs.get('temperature', self.config.temperature)
+            
+            stream = self.client.chat.completions.create(
+                model=self.config.model,
+                messages=[self._system_msg, {"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            self.healthy = True
+            
+            usage = None
+            finish_reason = None
+            for chunk in stream:
+                # The final chunk carries usage and has no choices
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+                text = choice.delta.content
+                if text:
+                    parts.append(text)
+                    yield text
+            
+            result.update({
+                "success": True,
+                "response": "".join(parts),
+                "model": self.config.model,
+                "usage": {
+                    "prompt_tokens": usage.prompt_tokens if usage else 0,
+                    "completion_tokens": usage.completion_tokens if usage else 0,
+                    "total_tokens": usage.total_tokens if usage else 0
+                },
+                "finish_reason": finish_reason
+            })
+            
+        except Exception as e:
+            self.healthy = False
+            logger.error(f"Error streaming OpenAI response: {str(e)}")
+            result.update({
+                "success": False,
+                "error": str(e),
+                "response": "Sorry, I encountered an error while processing your request."
+            })
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the current model."""
         return {
@@ -141,7 +253,8 @@ class OpenAIClient:
             "max_tokens": self.config.max_tokens,
             "temperature": self.config.temperature,
             "api_configured": bool(self.config.api_key),
-            "client_initialized": self.client is not None
+            "client_initialized": self.client is not None,
+            "connection_verified": self.healthy
         }
 
 
@@ -183,18 +296,28 @@ def initialize_openai_client() -> Optional[OpenAIClient]:
         return None
 
 
-def create_academic_prompt_openai(context: str, question: str) -> str:
-    """
-    Create a structured prompt for academic Q&A optimized for OpenAI models.
+# Process-wide client so the SDK's HTTP connection pool survives reruns
+_openai_client: Optional[OpenAIClient] = None
+_openai_lock = threading.Lock()
 
-    Args:
-        context: Retrieved context from documents
-        question: User's question
 
+def get_openai_client() -> Optional[OpenAIClient]:
+    """
+    Get the process-wide OpenAI client, initializing it on first use.
+    
     Returns:
-        str: Formatted prompt for OpenAI
+        OpenAIClient instance or None if initialization fails
     """
-    prompt = f"""You are an expert academic assistant helping students understand their course materials. Answer the following question based strictly on the provided context from academic documents.
+    global _openai_client
+    if _openai_client is None:
+        with _openai_lock:
+            if _openai_client is None:
+                _openai_client = initialize_openai_client()
+    return _openai_client
+
+
+# Static segments of the academic Q&A prompt; only the context and question vary
+PROMPT_HEAD = """You are an expert academic assistant helping students understand their course materials. Answer the following question based strictly on the provided context from academic documents.
 
 RESPONSE STRUCTURE:
 1. **MAIN ANSWER**: Start with the direct, concise answer to the question
@@ -210,14 +333,32 @@ GUIDELINES:
 - Avoid using outside knowledge not present in the documents
 
 CONTEXT:
-{context}
+"""
+PROMPT_MID = """
 
 QUESTION:
-{question}
+"""
+PROMPT_TAIL = """
 
 ANSWER:"""
 
-    return prompt
+
+@functools.lru_cache(maxsize=256)
+def create_academic_prompt_openai(context: str, question: str) -> str:
+    """
+    Create a structured prompt for academic Q&A optimized for OpenAI models.
+    
+    Results are memoized, so re-asking a question against the same context
+    returns the identical prompt string without rebuilding it.
+
+    Args:
+        context: Retrieved context from documents
+        question: User's question
+
+    Returns:
+        str: Formatted prompt for OpenAI
+    """
+    return "".join([PROMPT_HEAD, context, PROMPT_MID, question, PROMPT_TAIL])
 
 
 def query_openai(client: OpenAIClient, 
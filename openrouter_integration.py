@@ -4,15 +4,53 @@ Provides access to DeepSeek through OpenRouter's unified API
 """
 
 import os
+import json
+import time
+import hashlib
+import random
+import asyncio
 import logging
+import threading
 import requests
-from typing import Optional, Dict, Any
-from dataclasses import dataclass
+import numpy as np
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Iterator
+from dataclasses import dataclass, replace, asdict
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Exceptions raised by whichever HTTP library sent the request
+TIMEOUT_ERRORS = (requests.exceptions.Timeout,) + ((httpx.TimeoutException,) if HTTPX_AVAILABLE else ())
+NETWORK_ERRORS = (requests.exceptions.RequestException,) + ((httpx.HTTPError,) if HTTPX_AVAILABLE else ())
+CONNECTION_ERRORS = (requests.exceptions.ConnectionError,) + ((httpx.NetworkError,) if HTTPX_AVAILABLE else ())
+
+# Responses worth retrying; auth (401) and billing (402) errors are not
+TRANSIENT_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Near-deterministic requests are answered from an in-memory cache
+RESPONSE_CACHE_MAX_TEMPERATURE = 0.1
+RESPONSE_CACHE_TTL = 3600  # seconds
+RESPONSE_CACHE_MAX_SIZE = 512
+
+# Paraphrased questions about the same context reuse an earlier answer when
+# their embeddings are at least this similar
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_MAX_SIZE = 1000
+
 @dataclass
 class OpenRouterResponse:
     """Response from OpenRouter API."""
@@ -22,19 +60,221 @@ class OpenRouterResponse:
     success: bool
     error: Optional[str] = None
 
+
+def _dumps_json(payload: Dict[str, Any]) -> bytes:
+    """Serialize a request body to UTF-8 JSON bytes."""
+    return orjson.dumps(payload) if ORJSON_AVAILABLE else json.dumps(payload).encode("utf-8")
+
+
+def _loads_json(content) -> Any:
+    """Decode a JSON response body straight from bytes (or a str SSE line)."""
+    return orjson.loads(content) if ORJSON_AVAILABLE else json.loads(content)
+
+class ResponseCache:
+    """Thread-safe LRU cache of responses whose entries expire after a TTL."""
+    
+    def __init__(self, max_size: int = RESPONSE_CACHE_MAX_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        """
+        Initialize an empty cache.
+        
+        Args:
+            max_size: Entries kept before the least recently used one is evicted
+            ttl: Seconds an entry stays valid
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key: str, value: Any):
+        """Store value under key, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by all clients so repeated questions hit across Streamlit sessions
+_RESPONSE_CACHE = ResponseCache()
+
+
+class SemanticCache:
+    """Thread-safe LRU cache of answers matched by cosine similarity of question embeddings."""
+    
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, max_size: int = SEMANTIC_CACHE_MAX_SIZE):
+        """
+        Initialize an empty cache.
+        
+        Args:
+            threshold: Minimum cosine similarity for a cached answer to be reused
+            max_size: Entries kept before the least recently used one is evicted
+        """
+        self.threshold = threshold
+        self.max_size = max_size
+        # (context key, question) -> (L2-normalized embedding, answer)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, context_key: str, embedding: np.ndarray) -> Optional[str]:
+        """
+        Find the answer to the most similar question asked about the same context.
+        
+        Args:
+            context_key: Fingerprint of the document context
+            embedding: L2-normalized question embedding
+            
+        Returns:
+            Cached answer, or None if no question is similar enough
+        """
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == context_key]
+            if not keys:
+                return None
+            sims = np.stack([self._entries[key][0] for key in keys]) @ embedding
+            best = int(sims.argmax())
+            if sims[best] < self.threshold:
+                return None
+            self._entries.move_to_end(keys[best])
+            return self._entries[keys[best]][1]
+    
+    def put(self, context_key: str, question: str, embedding: np.ndarray, answer: str):
+        """Store an answer, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[(context_key, question)] = (embedding, answer)
+            self._entries.move_to_end((context_key, question))
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_SEMANTIC_CACHE = SemanticCache()
+
+
+def _embed_question(question: str, embedding_model) -> Optional[np.ndarray]:
+    """Return the L2-normalized embedding of question, or None if no model was given or encoding fails."""
+    if embedding_model is None:
+        return None
+    try:
+        return embedding_model.encode(question, normalize_embeddings=True)
+    except Exception as e:
+        logger.warning(f"Failed to embed question for semantic cache: {e}")
+        return None
+
+
+@dataclass
+class RetryConfig:
+    """Retry policy for transient OpenRouter failures."""
+    max_retries: int = 3
+    initial_delay: float = 0.5
+    max_delay: float = 30.0
+    backoff_factor: float = 2.0
+    
+    def delay_for(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Seconds to wait before retrying after the given (0-based) attempt.
+        
+        Args:
+            attempt: Index of the attempt that just failed
+            retry_after: Retry-After header from the server, if any
+            
+        Returns:
+            float: Server-requested delay, or exponential backoff plus up to 25% jitter
+        """
+        if retry_after:
+            try:
+                return min(self.max_delay, float(retry_after))
+            except ValueError:
+                pass  # HTTP-date form; fall back to backoff
+        delay = min(self.max_delay, self.initial_delay * self.backoff_factor ** attempt)
+        return delay + random.uniform(0, 0.25 * delay)
+
+
+class TokenBucket:
+    """Thread-safe token bucket that refills continuously up to a per-minute capacity."""
+    
+    def __init__(self, per_minute: float):
+        """
+        Initialize the bucket full.
+        
+        Args:
+            per_minute: Tokens added per minute, which is also the burst capacity
+        """
+        self.capacity = float(per_minute)
+        self.fill_rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self, amount: float = 1.0) -> float:
+        """
+        Take tokens from the bucket, going into debt if it is short.
+        
+        Args:
+            amount: Tokens to take (capped at the bucket capacity)
+            
+        Returns:
+            float: Seconds the caller must wait before using the tokens
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+            self.updated = now
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.fill_rate
+
+
 class OpenRouterClient:
     """Client for OpenRouter API to access DeepSeek and other models."""
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "deepseek/deepseek-chat"):
+    # Failures with a fixed message are built once; callers get copies with their own usage dict
+    _NOT_CONFIGURED = OpenRouterResponse(content="", model="", usage={}, success=False,
+                                         error="OpenRouter API key not configured")
+    _TIMEOUT = OpenRouterResponse(content="", model="", usage={}, success=False,
+                                  error="Request timeout. Please try again.")
+    
+    def __init__(self, api_key: Optional[str] = None, model: str = "deepseek/deepseek-chat",
+                 requests_per_minute: int = 60, tokens_per_minute: int = 100000,
+                 max_concurrent_requests: int = 8, retry_config: Optional[RetryConfig] = None,
+                 response_cache: Optional[ResponseCache] = None):
         """
         Initialize OpenRouter client.
         
         Args:
             api_key: OpenRouter API key
             model: Model to use (default: deepseek/deepseek-chat)
+            requests_per_minute: Request budget used to pace calls before the API returns 429
+            tokens_per_minute: Estimated prompt+completion token budget per minute
+            max_concurrent_requests: Upper bound on in-flight requests in generate_batch
+            retry_config: Retry policy for transient failures (default: RetryConfig())
+            response_cache: Cache for low-temperature responses (default: shared process-wide cache)
         """
         self.api_key = api_key or os.getenv('OPENROUTER_API_KEY')
         self.model = model
+        self.max_concurrent_requests = max_concurrent_requests
+        self.retry_config = retry_config or RetryConfig()
+        self.response_cache = response_cache if response_cache is not None else _RESPONSE_CACHE
+        self.stats = {"cache_hits": 0, "cache_misses": 0}
+        self._request_bucket = TokenBucket(requests_per_minute)
+        self._token_bucket = TokenBucket(tokens_per_minute)
         self.base_url = "https://openrouter.ai/api/v1"
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -43,8 +283,38 @@ class OpenRouterClient:
             "X-Title": "StudyMate AI"  # Optional: for analytics
         }
         
+        # One persistent connection (multiplexed over HTTP/2 when h2 is
+        # installed) instead of a fresh TCP+TLS handshake per request
+        self._client = self._new_http_client() if HTTPX_AVAILABLE else None
+        
         logger.info(f"OpenRouter client initialized with model: {self.model}")
     
+    def _new_http_client(self) -> "httpx.Client":
+        """Create the persistent HTTP client, preferring HTTP/2 when h2 is installed."""
+        client_options = {
+            "base_url": self.base_url,
+            "headers": self.headers,
+            "timeout": 30.0,
+            "limits": httpx.Limits(max_connections=10, max_keepalive_connections=10, keepalive_expiry=30)
+        }
+        try:
+            return httpx.Client(http2=True, **client_options)
+        except ImportError:
+            logger.info("h2 package not installed, using HTTP/1.1 for OpenRouter API")
+            return httpx.Client(**client_options)
+    
+    def close(self):
+        """Close the persistent HTTP connection."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def is_available(self) -> bool:
         """Check if OpenRouter API is available."""
         return bool(self.api_key and self.api_key.startswith('sk-or-'))
@@ -55,117 +325,414 @@ class OpenRouterClient:
             "provider": "OpenRouter",
             "model_name": self.model,
             "base_url": self.base_url,
-            "available": self.is_available()
+            "available": self.is_available(),
+            "cache_hits": self.stats["cache_hits"],
+            "cache_misses": self.stats["cache_misses"]
         }
     
-    def generate_response(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7) -> OpenRouterResponse:
+    def _build_payload(self, prompt: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+        """Build the chat completion request body for a single prompt."""
+        return {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": False
+        }
+    
+    def _rate_limit_delay(self, prompt: str, max_tokens: int) -> float:
+        """Reserve rate-limit budget for one request and return how long to wait before sending it."""
+        estimated_tokens = len(prompt) // 4 + max_tokens
+        return max(self._request_bucket.reserve(1), self._token_bucket.reserve(estimated_tokens))
+    
+    def _parse_response(self, response) -> OpenRouterResponse:
         """
-        Generate a response using OpenRouter API.
+        Turn an HTTP response into an OpenRouterResponse.
         
         Args:
-            prompt: Input prompt
-            max_tokens: Maximum tokens to generate
-            temperature: Sampling temperature
+            response: requests or httpx response (both expose status_code, text and content)
             
         Returns:
-            OpenRouterResponse: Response from the API
+            OpenRouterResponse: Parsed response or a descriptive error
         """
-        if not self.is_available():
+        if response.status_code == 200:
+            data = _loads_json(response.content)
+            
+            # Extract response content
+            content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
+            usage = data.get("usage", {})
+            
+            logger.info(f"OpenRouter API request successful")
             return OpenRouterResponse(
-                content="",
-                model="",
-                usage={},
-                success=False,
-                error="OpenRouter API key not configured"
+                content=content,
+                model=self.model,
+                usage=usage,
+                success=True
             )
         
+        error_msg = f"API request failed with status {response.status_code}: {response.text}"
+        
+        # Provide specific error messages for common issues
+        if response.status_code == 401:
+            error_msg = "Invalid OpenRouter API key. Please check your API key."
+        elif response.status_code == 429:
+            error_msg = "Rate limit exceeded. Please wait a moment and try again."
+        elif response.status_code == 402:
+            error_msg = "Insufficient credits. Please check your OpenRouter account balance."
+        
+        logger.error(f"OpenRouter API error: {error_msg}")
+        
+        return OpenRouterResponse(
+            content="",
+            model="",
+            usage={},
+            success=False,
+            error=error_msg
+        )
+    
+    def _cache_key(self, prompt: str, max_tokens: int, temperature: float) -> Optional[str]:
+        """Return the response cache key for a request, or None if it is too random to cache."""
+        if temperature > RESPONSE_CACHE_MAX_TEMPERATURE:
+            return None
+        request = json.dumps({"m": self.model, "p": prompt, "t": max_tokens, "T": temperature}, sort_keys=True)
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+    
+    def _cache_lookup(self, cache_key: Optional[str]) -> Optional[OpenRouterResponse]:
+        """Return a cached response for cache_key and update the hit/miss counters."""
+        if cache_key is None:
+            return None
+        cached = self.response_cache.get(cache_key)
+        self.stats["cache_hits" if cached is not None else "cache_misses"] += 1
+        return cached
+    
+    def _error_response(self, error_msg: str) -> OpenRouterResponse:
+        """Build a failed OpenRouterResponse carrying error_msg."""
+        return OpenRouterResponse(
+            content="",
+            model="",
+            usage={},
+            success=False,
+            error=error_msg
+        )
+    
+    def _send_once(self, payload: Dict[str, Any], prompt: str, max_tokens: int) -> Tuple[OpenRouterResponse, bool, Optional[str]]:
+        """
+        Send a single chat completion request.
+        
+        Returns:
+            Tuple of (response, whether the failure is transient, Retry-After header)
+        """
         try:
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "stream": False
-            }
+            delay = self._rate_limit_delay(prompt, max_tokens)
+            if delay > 0:
+                logger.info(f"Pacing OpenRouter request for {delay:.1f}s to stay under the rate limit")
+                time.sleep(delay)
             
             logger.info(f"Making OpenRouter API request to {self.model}")
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
+            if self._client is not None:
+                response = self._client.post("/chat/completions", content=_dumps_json(payload))
+            else:
+                response = requests.post(
+                    f"{self.base_url}/chat/completions",
+                    headers=self.headers,
+                    data=_dumps_json(payload),
+                    timeout=30
+                )
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Extract response content
-                content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-                usage = data.get("usage", {})
+            transient = response.status_code in TRANSIENT_STATUS_CODES
+            return self._parse_response(response), transient, response.headers.get("Retry-After") if transient else None
                 
-                logger.info(f"OpenRouter API request successful")
-                return OpenRouterResponse(
-                    content=content,
-                    model=self.model,
-                    usage=usage,
-                    success=True
-                )
+        except TIMEOUT_ERRORS:
+            logger.error(f"OpenRouter API timeout: {self._TIMEOUT.error}")
+            return self._TIMEOUT, True, None
+        except NETWORK_ERRORS as e:
+            error_msg = f"Network error: {str(e)}"
+            logger.error(f"OpenRouter API network error: {error_msg}")
+            return self._error_response(error_msg), isinstance(e, CONNECTION_ERRORS), None
+        except Exception as e:
+            error_msg = f"Unexpected error: {str(e)}"
+            logger.error(f"OpenRouter API unexpected error: {error_msg}")
+            return self._error_response(error_msg), False, None
+    
+    def generate_response_stream(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7,
+                                 result: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Stream a response from OpenRouter API as server-sent events arrive.
+        
+        Streams are not retried or cached; use generate_response for that.
+        
+        Args:
+            prompt: Input prompt
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            result: Optional dict filled with the OpenRouterResponse fields once the stream ends
+            
+        Yields:
+            str: Text fragments in the order they arrive
+        """
+        if result is None:
+            result = {}
+        if not self.is_available():
+            result.update(asdict(self._NOT_CONFIGURED))
+            return
+        
+        payload = self._build_payload(prompt, max_tokens, temperature)
+        payload["stream"] = True
+        parts = []
+        usage = {}
+        
+        try:
+            delay = self._rate_limit_delay(prompt, max_tokens)
+            if delay > 0:
+                logger.info(f"Pacing OpenRouter request for {delay:.1f}s to stay under the rate limit")
+                time.sleep(delay)
+            
+            logger.info(f"Making streaming OpenRouter API request to {self.model}")
+            if self._client is not None:
+                stream = self._client.stream("POST", "/chat/completions", content=_dumps_json(payload))
             else:
-                error_msg = f"API request failed with status {response.status_code}: {response.text}"
-                
-                # Provide specific error messages for common issues
-                if response.status_code == 401:
-                    error_msg = "Invalid OpenRouter API key. Please check your API key."
-                elif response.status_code == 429:
-                    error_msg = "Rate limit exceeded. Please wait a moment and try again."
-                elif response.status_code == 402:
-                    error_msg = "Insufficient credits. Please check your OpenRouter account balance."
-                
-                logger.error(f"OpenRouter API error: {error_msg}")
-                
-                return OpenRouterResponse(
-                    content="",
-                    model="",
-                    usage={},
-                    success=False,
-                    error=error_msg
+                stream = requests.post(
+                    f"{self.base_url}/chat/completions",
+                    headers=self.headers,
+                    data=_dumps_json(payload),
+                    timeout=30,
+                    stream=True
                 )
+            
+            with stream as response:
+                if response.status_code != 200:
+                    if self._client is not None:
+                        response.read()
+                    result.update(asdict(self._parse_response(response)))
+                    return
                 
-        except requests.exceptions.Timeout:
-            error_msg = "Request timeout. Please try again."
-            logger.error(f"OpenRouter API timeout: {error_msg}")
-            return OpenRouterResponse(
-                content="",
-                model="",
-                usage={},
-                success=False,
-                error=error_msg
-            )
-        except requests.exceptions.RequestException as e:
+                if self._client is not None:
+                    lines = response.iter_lines()
+                else:
+                    # The event stream is UTF-8; without a charset requests would decode it as ISO-8859-1
+                    response.encoding = "utf-8"
+                    lines = response.iter_lines(decode_unicode=True)
+                for line in lines:
+                    # Skip keep-alive comments such as ": OPENROUTER PROCESSING"
+                    if not line.startswith("data: "):
+                        continue
+                    data = line[6:]
+                    if data == "[DONE]":
+                        break
+                    chunk = _loads_json(data)
+                    if chunk.get("usage"):
+                        usage = chunk["usage"]
+                    choices = chunk.get("choices") or []
+                    text = choices[0].get("delta", {}).get("content") if choices else None
+                    if text:
+                        parts.append(text)
+                        yield text
+            
+            logger.info("OpenRouter streaming request successful")
+            result.update(asdict(OpenRouterResponse(
+                content="".join(parts),
+                model=self.model,
+                usage=usage,
+                success=True
+            )))
+            
+        except TIMEOUT_ERRORS:
+            logger.error(f"OpenRouter API timeout: {self._TIMEOUT.error}")
+            result.update(asdict(self._TIMEOUT))
+        except NETWORK_ERRORS as e:
             error_msg = f"Network error: {str(e)}"
             logger.error(f"OpenRouter API network error: {error_msg}")
-            return OpenRouterResponse(
-                content="",
-                model="",
-                usage={},
-                success=False,
-                error=error_msg
-            )
+            result.update(asdict(self._error_response(error_msg)))
         except Exception as e:
             error_msg = f"Unexpected error: {str(e)}"
             logger.error(f"OpenRouter API unexpected error: {error_msg}")
-            return OpenRouterResponse(
-                content="",
-                model="",
-                usage={},
-                success=False,
-                error=error_msg
-            )
+            result.update(asdict(self._error_response(error_msg)))
+    
+    def generate_response(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7,
+                          stream: bool = False) -> OpenRouterResponse:
+        """
+        Generate a response using OpenRouter API.
+        
+        Rate limits (429), server errors (5xx), timeouts and dropped connections
+        are retried with exponential backoff and jitter per self.retry_config.
+        
+        Args:
+            prompt: Input prompt
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            stream: Receive the completion as a stream and assemble it here
+                (no retries; see generate_response_stream)
+            
+        Returns:
+            OpenRouterResponse: Response from the API; usage["attempts"] records how many requests were sent
+        """
+        if not self.is_available():
+            return replace(self._NOT_CONFIGURED, usage={})
+        
+        if stream:
+            result = {}
+            for _ in self.generate_response_stream(prompt, max_tokens, temperature, result):
+                pass
+            return OpenRouterResponse(**result)
+        
+        cache_key = self._cache_key(prompt, max_tokens, temperature)
+        cached = self._cache_lookup(cache_key)
+        if cached is not None:
+            return cached
+        
+        payload = self._build_payload(prompt, max_tokens, temperature)
+        max_retries = self.retry_config.max_retries
+        
+        for attempt in range(max_retries + 1):
+            result, transient, retry_after = self._send_once(payload, prompt, max_tokens)
+            if not transient or attempt == max_retries:
+                break
+            delay = self.retry_config.delay_for(attempt, retry_after)
+            logger.warning(f"Transient OpenRouter failure, retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+            time.sleep(delay)
+        
+        result = replace(result, usage={**result.usage, "attempts": attempt + 1})
+        if cache_key is not None and result.success:
+            self.response_cache.put(cache_key, result)
+        return result
+    
+    def _new_async_client(self) -> "httpx.AsyncClient":
+        """Create an async HTTP client sized for a batch of concurrent requests."""
+        return httpx.AsyncClient(
+            headers=self.headers,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=32)
+        )
+    
+    async def _send_once_async(self, client: "httpx.AsyncClient", payload: Dict[str, Any], prompt: str,
+                               max_tokens: int) -> Tuple[OpenRouterResponse, bool, Optional[str]]:
+        """
+        Send a single chat completion request on the event loop.
+        
+        Returns:
+            Tuple of (response, whether the failure is transient, Retry-After header)
+        """
+        try:
+            delay = self._rate_limit_delay(prompt, max_tokens)
+            if delay > 0:
+                logger.info(f"Pacing OpenRouter request for {delay:.1f}s to stay under the rate limit")
+                await asyncio.sleep(delay)
+            
+            logger.info(f"Making async OpenRouter API request to {self.model}")
+            response = await client.post(f"{self.base_url}/chat/completions", content=_dumps_json(payload))
+            
+            transient = response.status_code in TRANSIENT_STATUS_CODES
+            return self._parse_response(response), transient, response.headers.get("Retry-After") if transient else None
+            
+        except TIMEOUT_ERRORS:
+            logger.error(f"OpenRouter API timeout: {self._TIMEOUT.error}")
+            return self._TIMEOUT, True, None
+        except NETWORK_ERRORS as e:
+            error_msg = f"Network error: {str(e)}"
+            logger.error(f"OpenRouter API network error: {error_msg}")
+            return self._error_response(error_msg), isinstance(e, CONNECTION_ERRORS), None
+        except Exception as e:
+            error_msg = f"Unexpected error: {str(e)}"
+            logger.error(f"OpenRouter API unexpected error: {error_msg}")
+            return self._error_response(error_msg), False, None
+    
+    async def generate_response_async(self, prompt: str, max_tokens: int = 500, temperature: float = 0.7,
+                                      client: Optional["httpx.AsyncClient"] = None) -> OpenRouterResponse:
+        """
+        Generate a response using OpenRouter API without blocking the event loop.
+        
+        Uses the same retry policy as generate_response.
+        
+        Args:
+            prompt: Input prompt
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            client: Optional shared async HTTP client; a temporary one is used otherwise
+            
+        Returns:
+            OpenRouterResponse: Response from the API
+        """
+        if not self.is_available():
+            return replace(self._NOT_CONFIGURED, usage={})
+        
+        if not HTTPX_AVAILABLE:
+            # No async HTTP client installed; run the blocking call off the loop
+            return await asyncio.to_thread(self.generate_response, prompt, max_tokens, temperature)
+        
+        if client is None:
+            async with self._new_async_client() as temp_client:
+                return await self.generate_response_async(prompt, max_tokens, temperature, temp_client)
+        
+        cache_key = self._cache_key(prompt, max_tokens, temperature)
+        cached = self._cache_lookup(cache_key)
+        if cached is not None:
+            return cached
+        
+        payload = self._build_payload(prompt, max_tokens, temperature)
+        max_retries = self.retry_config.max_retries
+        
+        for attempt in range(max_retries + 1):
+            result, transient, retry_after = await self._send_once_async(client, payload, prompt, max_tokens)
+            if not transient or attempt == max_retries:
+                break
+            delay = self.retry_config.delay_for(attempt, retry_after)
+            logger.warning(f"Transient OpenRouter failure, retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+            await asyncio.sleep(delay)
+        
+        result = replace(result, usage={**result.usage, "attempts": attempt + 1})
+        if cache_key is not None and result.success:
+            self.response_cache.put(cache_key, result)
+        return result
+    
+    async def generate_batch(self, prompts: List[str], max_tokens: int = 500,
+                             temperature: float = 0.7) -> List[OpenRouterResponse]:
+        """
+        Generate responses for several prompts concurrently.
+        
+        All requests share one connection pool, so the batch takes roughly as
+        long as its slowest request instead of the sum of all of them. At most
+        max_concurrent_requests are in flight, and each request is paced by the
+        client's rate limits.
+        
+        Args:
+            prompts: Input prompts
+            max_tokens: Maximum tokens to generate per prompt
+            temperature: Sampling temperature
+            
+        Returns:
+            List[OpenRouterResponse]: Responses in the same order as prompts
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        
+        async def run(prompt: str, client: Optional["httpx.AsyncClient"] = None) -> OpenRouterResponse:
+            async with semaphore:
+                return await self.generate_response_async(prompt, max_tokens, temperature, client)
+        
+        if not HTTPX_AVAILABLE:
+            return await asyncio.gather(*[run(prompt) for prompt in prompts])
+        
+        async with self._new_async_client() as client:
+            return await asyncio.gather(*[run(prompt, client) for prompt in prompts])
+    
+    def generate_batch_sync(self, prompts: List[str], max_tokens: int = 500,
+                            temperature: float = 0.7) -> List[OpenRouterResponse]:
+        """
+        Blocking wrapper around generate_batch for synchronous callers.
+        
+        Args:
+            prompts: Input prompts
+            max_tokens: Maximum tokens to generate per prompt
+            temperature: Sampling temperature
+            
+        Returns:
+            List[OpenRouterResponse]: Responses in the same order as prompts
+        """
+        return asyncio.run(self.generate_batch(prompts, max_tokens, temperature))
     
     def test_connection(self) -> bool:
         """Test the API connection."""
@@ -210,31 +777,75 @@ def initialize_openrouter_client() -> Optional[OpenRouterClient]:
         logger.error(f"Failed to initialize OpenRouter client: {e}")
         return None
 
-def query_openrouter_deepseek(client: OpenRouterClient, context: str, question: str) -> str:
+# Static segments of the Q&A prompt; only the context and question vary
+QA_PROMPT_HEAD = """Based on the following context, please answer the question accurately and concisely.
+
+Context:
+"""
+QA_PROMPT_MID = """
+
+Question: """
+QA_PROMPT_TAIL = """
+
+Please provide a clear, informative answer based on the context provided."""
+
+
+def _build_qa_prompt(context: str, question: str) -> str:
+    """Build the Q&A prompt sent to DeepSeek through OpenRouter."""
+    return "".join([QA_PROMPT_HEAD, context, QA_PROMPT_MID, question, QA_PROMPT_TAIL])
+
+
+def _semantic_lookup(context: str, question: str, embedding_model) -> Tuple[str, Optional[np.ndarray], Optional[str]]:
+    """
+    Look up an earlier answer to a paraphrase of question for the same context.
+    
+    Args:
+        context: Document context
+        question: User question
+        embedding_model: Already loaded SentenceTransformer, or None to skip the lookup
+    
+    Returns:
+        Tuple of (context key, question embedding or None, cached answer or None)
+    """
+    context_key = hashlib.blake2b(context.encode("utf-8"), digest_size=16).hexdigest()
+    embedding = _embed_question(question, embedding_model)
+    cached = _SEMANTIC_CACHE.get(context_key, embedding) if embedding is not None else None
+    if cached is not None:
+        logger.info("Answered from semantic cache")
+    return context_key, embedding, cached
+
+
+def query_openrouter_deepseek(client: OpenRouterClient, context: str, question: str,
+                              embedding_model=None) -> str:
     """
     Query DeepSeek through OpenRouter for Q&A.
     
+    When an embedding model is given, questions that paraphrase one already
+    answered for the same context are served from the semantic cache without
+    an API call.
+    
     Args:
         client: OpenRouter client
         context: Document context
         question: User question
+        embedding_model: SentenceTransformer the caller already has loaded (e.g. the
+            document retriever's model); the semantic cache is skipped without one
         
     Returns:
         str: AI response
     """
     try:
-        prompt = f"""Based on the following context, please answer the question accurately and concisely.
-
-Context:
-{context}
-
-Question: {question}
-
-Please provide a clear, informative answer based on the context provided."""
+        context_key, embedding, cached = _semantic_lookup(context, question, embedding_model)
+        if cached is not None:
+            return cached
+        
+        prompt = _build_qa_prompt(context, question)
 
         response = client.generate_response(prompt, max_tokens=500, temperature=0.7)
         
         if response.success:
+            if embedding is not None:
+                _SEMANTIC_CACHE.put(context_key, question, embedding, response.content)
             return response.content
         else:
             logger.error(f"OpenRouter query failed: {response.error}")
@@ -244,59 +855,276 @@ Please provide a clear, informative answer based on the context provided."""
         logger.error(f"Error querying OpenRouter: {e}")
         return "I apologize, but I encountered an error while processing your question."
 
-def generate_mcqs_with_openrouter(client: OpenRouterClient, context: str, num_questions: int = 5, 
-                                 difficulty: str = "medium", topic_focus: str = "") -> str:
+
+def query_openrouter_deepseek_stream(client: OpenRouterClient, context: str, question: str,
+                                     embedding_model=None) -> Iterator[str]:
     """
-    Generate MCQs using OpenRouter DeepSeek.
+    Streaming variant of query_openrouter_deepseek for rendering tokens as they arrive.
     
     Args:
         client: OpenRouter client
         context: Document context
-        num_questions: Number of questions
-        difficulty: Difficulty level
-        topic_focus: Topic focus
+        question: User question
+        embedding_model: SentenceTransformer the caller already has loaded; the
+            semantic cache is skipped without one
         
-    Returns:
-        str: Generated MCQs in JSON format
+    Yields:
+        str: Answer fragments; the full text matches what query_openrouter_deepseek returns
     """
     try:
-        topic_instruction = f"\n- Focus specifically on: {topic_focus}" if topic_focus else ""
+        context_key, embedding, cached = _semantic_lookup(context, question, embedding_model)
+        if cached is not None:
+            yield cached
+            return
         
-        prompt = f"""You are an expert educator creating multiple choice questions for exam preparation. Generate {num_questions} high-quality questions based SPECIFICALLY on the provided document content.
+        result = {}
+        yield from client.generate_response_stream(_build_qa_prompt(context, question), 500, 0.7, result)
+        
+        if result.get("success"):
+            if embedding is not None:
+                _SEMANTIC_CACHE.put(context_key, question, embedding, result["content"])
+        else:
+            logger.error(f"OpenRouter query failed: {result.get('error')}")
+            yield f"I apologize, but I encountered an error: {result.get('error')}"
+            
+    except Exception as e:
+        logger.error(f"Error querying OpenRouter: {e}")
+        yield "I apologize, but I encountered an error while processing your question."
+
+# Instruction block shared by every MCQ request. It must stay byte-identical
+# and come first in the prompt: interpolating anything into it or moving it
+# after the document content defeats the provider's prefix caching.
+MCQ_PROMPT_PREFIX = """You are an expert educator creating multiple choice questions for exam preparation. Generate the requested number of high-quality questions based SPECIFICALLY on the provided document content.
 
 CRITICAL REQUIREMENTS:
 - Questions MUST be directly based on the specific content provided below
 - DO NOT use generic questions that could apply to any document
 - Extract specific facts, concepts, examples, and details from the document
 - Reference specific names, dates, processes, or examples mentioned in the content
-- Difficulty level: {difficulty}
+- Use the difficulty level given in the question settings
 - Each question should have exactly 4 options (A, B, C, D)
 - Only ONE option should be correct
-- Include a brief explanation referencing the document content{topic_instruction}
+- Include a brief explanation referencing the document content
 
 RESPONSE FORMAT (JSON):
-{{
+{
     "questions": [
-        {{
+        {
             "question": "Question text here?",
             "options": [
-                {{"text": "Option A", "is_correct": false}},
-                {{"text": "Option B", "is_correct": true}},
-                {{"text": "Option C", "is_correct": false}},
-                {{"text": "Option D", "is_correct": false}}
+                {"text": "Option A", "is_correct": false},
+                {"text": "Option B", "is_correct": true},
+                {"text": "Option C", "is_correct": false},
+                {"text": "Option D", "is_correct": false}
             ],
-            "difficulty": "{difficulty}",
+            "difficulty": "easy|medium|hard",
             "topic": "Topic from document",
             "explanation": "Brief explanation referencing the document content"
-        }}
+        }
     ]
-}}
+}
+
+"""
+
+# Static segments of the request-specific MCQ settings that follow the prefix
+MCQ_SETTINGS_COUNT = """QUESTION SETTINGS:
+- Number of questions: """
+MCQ_SETTINGS_DIFFICULTY = """
+- Difficulty level: """
+MCQ_DIFFICULTY_NOTE = """ (use this value for every "difficulty" field)"""
+MCQ_TOPIC_FOCUS = """
+- Focus specifically on: """
+MCQ_DOCUMENT_HEAD = """
 
 Document Content:
-{context}
+"""
+MCQ_GENERATE_HEAD = """
+
+Generate """
+MCQ_GENERATE_TAIL = """ questions in the exact JSON format shown above:"""
+
+# Several small chunks can share one MCQ request; groups are bounded so the
+# combined answer still fits in the completion budget
+MCQ_TOKENS_PER_QUESTION = 300  # Same budget as 1500 tokens for 5 questions
+MCQ_BATCH_MAX_CHARS = 12000
+MCQ_BATCH_MAX_QUESTIONS = 15
+
+MCQ_BATCH_FORMAT = """BATCH MODE:
+- The document content is split into numbered chunks
+- Generate the requested number of questions for EACH chunk, based only on that chunk
+- Return one entry per chunk, in chunk order, wrapped as:
+{"chunks": [{"questions": [...]}, {"questions": [...]}]}
+- Each "questions" list uses the question format shown above
+
+"""
+MCQ_BATCH_COUNT = """QUESTION SETTINGS:
+- Number of questions per chunk: """
+MCQ_BATCH_CHUNK_HEAD = """
+
+### Chunk """
+MCQ_BATCH_GENERATE_TAIL = """ questions for each chunk in the exact JSON format described above:"""
+
+
+def _build_mcq_prompt(context: str, num_questions: int, difficulty: str, topic_focus: str) -> str:
+    """Build the MCQ prompt for a single context."""
+    count = str(num_questions)
+    
+    # Static prefix first so the provider's prompt cache can reuse it;
+    # everything request-specific goes after it
+    return "".join([
+        MCQ_PROMPT_PREFIX,
+        MCQ_SETTINGS_COUNT, count,
+        MCQ_SETTINGS_DIFFICULTY, difficulty, MCQ_DIFFICULTY_NOTE,
+        MCQ_TOPIC_FOCUS + topic_focus if topic_focus else "",
+        MCQ_DOCUMENT_HEAD, context,
+        MCQ_GENERATE_HEAD, count, MCQ_GENERATE_TAIL
+    ])
+
+
+def _build_mcq_batch_prompt(contexts: List[str], per_context: int, difficulty: str, topic_focus: str) -> str:
+    """Build one MCQ prompt covering several numbered contexts."""
+    parts = [
+        MCQ_PROMPT_PREFIX, MCQ_BATCH_FORMAT,
+        MCQ_BATCH_COUNT, str(per_context),
+        MCQ_SETTINGS_DIFFICULTY, difficulty, MCQ_DIFFICULTY_NOTE,
+        MCQ_TOPIC_FOCUS + topic_focus if topic_focus else ""
+    ]
+    for number, context in enumerate(contexts, 1):
+        parts.extend([MCQ_BATCH_CHUNK_HEAD, str(number), ":\n", context])
+    parts.extend([MCQ_GENERATE_HEAD, str(per_context), MCQ_BATCH_GENERATE_TAIL])
+    return "".join(parts)
+
+
+def _group_mcq_contexts(contexts: List[str], per_context: int) -> List[List[int]]:
+    """Greedily group context indices so each group stays within the batch limits."""
+    per_group = max(1, MCQ_BATCH_MAX_QUESTIONS // max(per_context, 1))
+    groups = []
+    current, current_chars = [], 0
+    for index, context in enumerate(contexts):
+        if current and (len(current) == per_group or current_chars + len(context) > MCQ_BATCH_MAX_CHARS):
+            groups.append(current)
+            current, current_chars = [], 0
+        current.append(index)
+        current_chars += len(context)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _split_mcq_batch(content: str, expected: int) -> List[Optional[str]]:
+    """
+    Split a batched MCQ answer into one questions JSON string per chunk.
+    
+    Args:
+        content: Model output, expected to hold {"chunks": [{"questions": [...]}, ...]}
+        expected: Number of chunks in the request
+        
+    Returns:
+        List of JSON strings in chunk order, None where a chunk is missing or empty
+    """
+    start, end = content.find("{"), content.rfind("}")
+    try:
+        chunks = _loads_json(content[start:end + 1])["chunks"] if start != -1 else []
+    except (ValueError, KeyError, TypeError):
+        chunks = []
+    
+    parts = []
+    for position in range(expected):
+        entry = chunks[position] if position < len(chunks) and isinstance(chunks[position], dict) else {}
+        questions = entry.get("questions")
+        parts.append(_dumps_json({"questions": questions}).decode("utf-8") if questions else None)
+    return parts
+
+
+def generate_mcqs_batch(client: OpenRouterClient, contexts: List[str], per_context: int = 3,
+                        difficulty: str = "medium", topic_focus: str = "") -> List[str]:
+    """
+    Generate MCQs for several contexts, packing small ones into shared requests.
+    
+    Contexts are grouped so each request carries a few chunks; the groups are
+    sent concurrently. Chunks whose batched answer is truncated or missing are
+    regenerated with one request each.
+    
+    Args:
+        client: OpenRouter client
+        contexts: Document chunks to write questions about
+        per_context: Number of questions per chunk
+        difficulty: Difficulty level
+        topic_focus: Topic focus
+        
+    Returns:
+        List[str]: Generated MCQs in JSON format per context, in order ("" where generation failed)
+    """
+    results = [""] * len(contexts)
+    if not contexts:
+        return results
+    
+    try:
+        groups = _group_mcq_contexts(contexts, per_context)
+        prompts = [
+            _build_mcq_prompt(contexts[group[0]], per_context, difficulty, topic_focus) if len(group) == 1
+            else _build_mcq_batch_prompt([contexts[i] for i in group], per_context, difficulty, topic_focus)
+            for group in groups
+        ]
+        max_tokens = max(len(group) for group in groups) * per_context * MCQ_TOKENS_PER_QUESTION
+        logger.info(f"Generating MCQs for {len(contexts)} chunks in {len(groups)} OpenRouter requests")
+        responses = client.generate_batch_sync(prompts, max_tokens=max_tokens, temperature=0.3)
+        
+        retry = []
+        for group, response in zip(groups, responses):
+            if not response.success:
+                logger.error(f"OpenRouter MCQ generation failed: {response.error}")
+                if len(group) > 1:
+                    retry.extend(group)
+                continue
+            if len(group) == 1:
+                results[group[0]] = response.content
+                continue
+            # A completion that used the whole budget was cut off mid-JSON
+            if response.usage.get("completion_tokens", 0) >= max_tokens:
+                parts = [None] * len(group)
+            else:
+                parts = _split_mcq_batch(response.content, len(group))
+            for index, part in zip(group, parts):
+                if part is None:
+                    retry.append(index)
+                else:
+                    results[index] = part
+        
+        if retry:
+            logger.warning(f"Batched MCQ answer incomplete for {len(retry)} chunks, generating them individually")
+            fallback = client.generate_batch_sync(
+                [_build_mcq_prompt(contexts[i], per_context, difficulty, topic_focus) for i in retry],
+                max_tokens=per_context * MCQ_TOKENS_PER_QUESTION,
+                temperature=0.3
+            )
+            for index, response in zip(retry, fallback):
+                results[index] = response.content if response.success else ""
+        
+        return results
+        
+    except Exception as e:
+        logger.error(f"Error generating batched MCQs with OpenRouter: {e}")
+        return results
 
-Generate {num_questions} questions in the exact JSON format shown above:"""
 
+def generate_mcqs_with_openrouter(client: OpenRouterClient, context: str, num_questions: int = 5, 
+                                 difficulty: str = "medium", topic_focus: str = "") -> str:
+    """
+    Generate MCQs using OpenRouter DeepSeek.
+    
+    Args:
+        client: OpenRouter client
+        context: Document context
+        num_questions: Number of questions
+        difficulty: Difficulty level
+        topic_focus: Topic focus
+        
+    Returns:
+        str: Generated MCQs in JSON format
+    """
+    try:
+        prompt = _build_mcq_prompt(context, num_questions, difficulty, topic_focus)
         response = client.generate_response(prompt, max_tokens=1500, temperature=0.3)
         
         if response.success:
@@ -4,90 +4,214 @@ Handles PDF text extraction, cleaning, and chunking for RAG system
 """
 
 import fitz  # PyMuPDF
+import os
 import re
-from typing import List, Dict, Any
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Tuple, Iterator
 import logging
 
+try:
+    import re2  # google-re2: linear-time matching, no backtracking
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# clean_text runs on every page of every PDF, so its patterns are compiled once
+_RE_BLANK_LINES = re.compile(r'\n\s*\n\s*\n')
+_RE_SPACES = re.compile(r'[ \t]+')
+# Header/footer artifacts that are deleted outright, matched in one pass:
+# bare page numbers, "Page N" lines, URLs and email addresses. Alternatives
+# are tried left to right at each position; text exposed by one deletion is
+# not re-scanned, so the order only matters for tokens glued together.
+# RE2 has no verbose mode, so the alternatives are joined into a plain string.
+_HEADER_FOOTER_PATTERN = "|".join([
+    r'^\d+\s*$',
+    r'^\s*Page\s+\d+\s*$',
+    r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+',
+    r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b',
+])
+# The URL class is backtracking-prone on long punctuation-heavy tokens, so
+# prefer RE2's linear-time engine for this scan when it is installed
+if RE2_AVAILABLE:
+    _RE_HEADER_FOOTER = re2.compile("(?m)" + _HEADER_FOOTER_PATTERN)
+else:
+    _RE_HEADER_FOOTER = re.compile(_HEADER_FOOTER_PATTERN, re.MULTILINE)
+_RE_BULLETS = re.compile(r'[•·▪▫◦‣⁃]{2,}')
+_RE_DASHES = re.compile(r'-{3,}')
+_RE_EQUALS = re.compile(r'={3,}')
+
+
+# PyMuPDF is not thread-safe and holds the GIL while extracting, so batches of
+# files and long documents are spread over worker processes instead of threads
+PAGE_POOL_MIN_PAGES = 32
+MAX_PDF_WORKERS = min(8, os.cpu_count() or 1)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_pdf_process_pool() -> ProcessPoolExecutor:
+    """Get the worker process pool used to extract PDF files and page ranges."""
+    return ProcessPoolExecutor(max_workers=MAX_PDF_WORKERS)
+
+
+def _extract_page_text(page, page_num: int) -> str:
+    """
+    Extract and clean the text of a single PDF page.
 
-def extract_text_from_pdf(pdf_file) -> str:
+    Args:
+        page: PyMuPDF page object
+        page_num: Zero-based page index, used for logging
+
+    Returns:
+        str: Cleaned page text, or empty string if the page has no text
     """
-    Extract clean text from a PDF file using PyMuPDF.
+    # Method 1: Standard text extraction
+    text = page.get_text("text")
+
+    # Method 2: If no text found, try blocks extraction (already joined per block)
+    if not text.strip():
+        blocks = page.get_text("blocks")
+        text = "\n".join([block[4] for block in blocks if len(block) > 4 and block[4].strip()])
+
+    # Method 3: If still no text, try dict extraction (better for complex layouts)
+    if not text.strip():
+        text_dict = page.get_text("dict")
+        text = extract_text_from_dict(text_dict)
+
+    logger.info(f"Page {page_num + 1}: extracted {len(text)} characters")
+
+    if not text.strip():
+        return ""
+
+    cleaned_text = clean_text(text)
+    if cleaned_text:
+        logger.info(f"Page {page_num + 1}: {len(cleaned_text)} characters after cleaning")
+    return cleaned_text
+
+
+def _extract_page_range(pdf_bytes: bytes, start: int, stop: int) -> List[str]:
+    """
+    Extract cleaned text for pages [start, stop) of a PDF held in memory.
+
+    Runs in a worker process, so the document is opened from bytes here.
 
     Args:
-        pdf_file: Streamlit uploaded file object
+        pdf_bytes: Raw PDF data
+        start: First page index
+        stop: Page index to stop before
 
     Returns:
-        str: Extracted and cleaned text
+        List[str]: Cleaned text per page, in page order (empty for blank pages)
     """
-    try:
-        # Reset file pointer to beginning
-        pdf_file.seek(0)
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_document:
+        return [_extract_page_text(pdf_document[page_num], page_num) for page_num in range(start, stop)]
 
-        # Read PDF from uploaded file
-        pdf_bytes = pdf_file.read()
-        logger.info(f"Read {len(pdf_bytes)} bytes from {pdf_file.name}")
 
-        if len(pdf_bytes) == 0:
-            logger.error(f"No data read from {pdf_file.name}")
-            return ""
+def _extract_pages_parallel(pdf_bytes: bytes, page_count: int) -> List[str]:
+    """
+    Extract all pages of a long PDF across the worker process pool.
 
-        # Open PDF document
-        pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-        logger.info(f"Opened PDF with {pdf_document.page_count} pages")
+    Args:
+        pdf_bytes: Raw PDF data
+        page_count: Number of pages in the document
 
-        text_content = []
+    Returns:
+        List[str]: Cleaned text per page, in page order
+    """
+    step = -(-page_count // MAX_PDF_WORKERS)
+    starts = list(range(0, page_count, step))
+    stops = [min(start + step, page_count) for start in starts]
+    pages = []
+    for page_texts in _get_pdf_process_pool().map(_extract_page_range, [pdf_bytes] * len(starts), starts, stops):
+        pages.extend(page_texts)
+    return pages
 
-        for page_num in range(pdf_document.page_count):
-            page = pdf_document[page_num]
 
-            # Try multiple extraction methods
-            text = ""
+def extract_text_from_bytes(pdf_bytes: bytes, name: str, parallel_pages: bool = True) -> str:
+    """
+    Extract clean text from PDF data held in memory.
 
-            # Method 1: Standard text extraction
-            text = page.get_text("text")
+    Args:
+        pdf_bytes: Raw PDF data
+        name: File name, used for logging
+        parallel_pages: Spread long documents over the process pool; disabled
+            when already running inside a pool worker
 
-            # Method 2: If no text found, try dict extraction (better for complex layouts)
-            if not text.strip():
-                text_dict = page.get_text("dict")
-                text = extract_text_from_dict(text_dict)
+    Returns:
+        str: Extracted and cleaned text
+    """
+    try:
+        if len(pdf_bytes) == 0:
+            logger.error(f"No data read from {name}")
+            return ""
 
-            # Method 3: If still no text, try blocks extraction
-            if not text.strip():
-                blocks = page.get_text("blocks")
-                text = "\n".join([block[4] for block in blocks if len(block) > 4 and block[4].strip()])
+        # Open PDF document
+        pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+        page_count = pdf_document.page_count
+        logger.info(f"Opened PDF with {page_count} pages")
 
-            logger.info(f"Page {page_num + 1}: extracted {len(text)} characters")
+        pages = None
+        if parallel_pages and page_count >= PAGE_POOL_MIN_PAGES and MAX_PDF_WORKERS > 1:
+            try:
+                pages = _extract_pages_parallel(pdf_bytes, page_count)
+            except (BrokenProcessPool, OSError) as e:
+                logger.warning(f"PDF process pool unavailable, extracting serially: {str(e)}")
+                _get_pdf_process_pool.cache_clear()
 
-            if text.strip():  # Only add non-empty pages
-                # Clean the extracted text
-                cleaned_text = clean_text(text)
-                if cleaned_text:
-                    text_content.append(cleaned_text)
-                    logger.info(f"Page {page_num + 1}: {len(cleaned_text)} characters after cleaning")
+        if pages is None:
+            pages = [_extract_page_text(pdf_document[page_num], page_num) for page_num in range(page_count)]
 
         pdf_document.close()
 
-        # Combine all pages
-        full_text = "\n\n".join(text_content)
-        logger.info(f"Successfully extracted {len(full_text)} characters total from {pdf_file.name}")
+        # Combine all non-empty pages
+        full_text = "\n\n".join(text for text in pages if text)
+        logger.info(f"Successfully extracted {len(full_text)} characters total from {name}")
 
         if len(full_text.strip()) == 0:
-            logger.warning(f"No text content extracted from {pdf_file.name}. This might be a scanned PDF or image-based PDF.")
+            logger.warning(f"No text content extracted from {name}. This might be a scanned PDF or image-based PDF.")
             return "No text content could be extracted from this PDF. This might be a scanned document or image-based PDF that requires OCR processing."
 
         return full_text
 
     except Exception as e:
-        logger.error(f"Error extracting text from {pdf_file.name}: {str(e)}")
+        logger.error(f"Error extracting text from {name}: {str(e)}")
         import traceback
         logger.error(f"Full traceback: {traceback.format_exc()}")
         return ""
 
 
+def extract_text_from_pdf(pdf_file) -> str:
+    """
+    Extract clean text from a PDF file using PyMuPDF.
+
+    Reads the whole file; use extract_text_from_bytes when the bytes are
+    already in memory to avoid a second copy.
+
+    Args:
+        pdf_file: Streamlit uploaded file object
+
+    Returns:
+        str: Extracted and cleaned text
+    """
+    try:
+        # Reset file pointer to beginning
+        pdf_file.seek(0)
+
+        # Read PDF from uploaded file
+        pdf_bytes = pdf_file.read()
+        logger.info(f"Read {len(pdf_bytes)} bytes from {pdf_file.name}")
+    except Exception as e:
+        logger.error(f"Error reading {pdf_file.name}: {str(e)}")
+        return ""
+
+    return extract_text_from_bytes(pdf_bytes, pdf_file.name)
+
+
 def extract_text_from_dict(text_dict: dict) -> str:
     """
     Extract text from PyMuPDF text dictionary format.
@@ -98,21 +222,17 @@ def extract_text_from_dict(text_dict: dict) -> str:
     Returns:
         str: Extracted text
     """
-    text_parts = []
-
     try:
-        for block in text_dict.get("blocks", []):
-            if "lines" in block:
-                for line in block["lines"]:
-                    line_text = ""
-                    for span in line.get("spans", []):
-                        line_text += span.get("text", "")
-                    if line_text.strip():
-                        text_parts.append(line_text.strip())
+        # Text blocks always carry lines -> spans -> text, so index directly
+        lines = (
+            "".join(span["text"] for span in line["spans"]).strip()
+            for block in text_dict.get("blocks", []) if "lines" in block
+            for line in block["lines"]
+        )
+        return "\n".join(line for line in lines if line)
     except Exception as e:
         logger.error(f"Error extracting text from dict: {str(e)}")
-
-    return "\n".join(text_parts)
+        return ""
 
 
 def clean_text(text: str) -> str:
@@ -129,25 +249,24 @@ def clean_text(text: str) -> str:
         return ""
     
     # Remove excessive whitespace and normalize line breaks
-    text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
-    text = re.sub(r'[ \t]+', ' ', text)
+    text = _RE_BLANK_LINES.sub('\n\n', text)
+    text = _RE_SPACES.sub(' ', text)
     
-    # Remove common header/footer patterns
-    # Page numbers at start/end of lines
-    text = re.sub(r'^\d+\s*$', '', text, flags=re.MULTILINE)
-    text = re.sub(r'^\s*Page\s+\d+\s*$', '', text, flags=re.MULTILINE)
+    # Remove common header/footer patterns: page numbers, "Page N" lines,
+    # URLs and email addresses. This runs after whitespace normalization and
+    # before the replacement passes below, which rely on it having run.
+    text = _RE_HEADER_FOOTER.sub('', text)
     
-    # Remove URLs and email addresses (often in headers/footers)
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-    text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '', text)
-    
-    # Remove excessive punctuation
-    text = re.sub(r'[•·▪▫◦‣⁃]{2,}', '• ', text)
-    text = re.sub(r'-{3,}', '---', text)
-    text = re.sub(r'={3,}', '===', text)
+    # Remove excessive punctuation. Dash and equals rules are rare, so a
+    # substring check skips their regex scan on most pages.
+    text = _RE_BULLETS.sub('• ', text)
+    if '---' in text:
+        text = _RE_DASHES.sub('---', text)
+    if '===' in text:
+        text = _RE_EQUALS.sub('===', text)
     
     # Clean up spacing
-    text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
+    text = _RE_BLANK_LINES.sub('\n\n', text)
     text = text.strip()
     
     return text
@@ -174,46 +293,127 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 100) -> List[str
     if len(words) <= chunk_size:
         return [text]
     
+    # A step of zero or less would never advance, so fall back to no overlap
+    step = chunk_size - overlap if chunk_size > overlap else chunk_size
     chunks = []
-    start = 0
     
-    while start < len(words):
-        # Calculate end position
+    # split() leaves no empty or padded words, so each joined slice is
+    # already non-empty and stripped
+    for start in range(0, len(words), step):
         end = min(start + chunk_size, len(words))
-        
-        # Extract chunk
-        chunk_words = words[start:end]
-        chunk_text = ' '.join(chunk_words)
-        
-        # Only add non-empty chunks
-        if chunk_text.strip():
-            chunks.append(chunk_text.strip())
-        
-        # Move start position (with overlap)
+        chunks.append(' '.join(words[start:end]))
         if end >= len(words):
             break
-        start = end - overlap
-        
-        # Ensure we don't get stuck in infinite loop
-        if start <= 0:
-            start = end
     
     logger.info(f"Created {len(chunks)} chunks from {len(words)} words")
     return chunks
 
 
-def process_uploaded_pdfs(uploaded_files) -> List[Dict[str, Any]]:
+def _process_one_pdf(pdf_bytes: bytes, name: str, file_idx: int,
+                     parallel_pages: bool = True) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
     """
-    Process multiple uploaded PDF files and return structured chunks.
+    Extract and chunk a single PDF.
 
     Args:
-        uploaded_files: List of Streamlit uploaded file objects
+        pdf_bytes: Raw PDF data
+        name: File name
+        file_idx: Position of the file in the upload batch
+        parallel_pages: Spread long documents over the process pool
 
     Returns:
-        List[Dict]: List of chunk dictionaries with metadata
+        Tuple of (chunk dictionaries with metadata, processing result)
+    """
+    # Extract text from PDF
+    text = extract_text_from_bytes(pdf_bytes, name, parallel_pages)
+
+    if not text or len(text.strip()) == 0:
+        logger.warning(f"No text extracted from {name}")
+        return [], {
+            "filename": name,
+            "status": "failed",
+            "reason": "No text content found"
+        }
+
+    logger.info(f"Extracted {len(text)} characters from {name}")
+
+    # Create chunks
+    chunks = chunk_text(text)
+
+    if not chunks:
+        logger.warning(f"No chunks created from {name}")
+        return [], {
+            "filename": name,
+            "status": "failed",
+            "reason": "Could not create text chunks"
+        }
+
+    # Add metadata to each chunk
+    file_chunks = [
+        {
+            "filename": name,
+            "chunk_index": chunk_idx,
+            "text": chunk,
+            "file_index": file_idx,
+            "original_text_length": len(text)
+        }
+        for chunk_idx, chunk in enumerate(chunks)
+    ]
+
+    logger.info(f"Successfully processed {name}: {len(file_chunks)} chunks created")
+
+    return file_chunks, {
+        "filename": name,
+        "status": "success",
+        "chunks_created": len(file_chunks),
+        "text_length": len(text)
+    }
+
+
+def _iter_pdf_outcomes(pending: List[Tuple[int, str, bytes]]) -> Iterator[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+    """
+    Process validated PDFs, yielding each file's outcome in upload order.
+
+    Args:
+        pending: (file_idx, name, pdf_bytes) for each file to process
+
+    Yields:
+        Tuple of (chunk dictionaries, processing result) per file
+    """
+    done = 0
+    if len(pending) > 1 and MAX_PDF_WORKERS > 1:
+        indices, names, datas = zip(*pending)
+        try:
+            # Each worker already handles a whole file, so page ranges stay serial
+            for outcome in _get_pdf_process_pool().map(
+                _process_one_pdf, datas, names, indices, [False] * len(pending)
+            ):
+                yield outcome
+                done += 1
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"PDF process pool unavailable, processing files serially: {str(e)}")
+            _get_pdf_process_pool.cache_clear()
+
+    for file_idx, name, pdf_bytes in pending[done:]:
+        yield _process_one_pdf(pdf_bytes, name, file_idx)
+
+
+def iter_uploaded_pdf_chunks(uploaded_files) -> Iterator[Dict[str, Any]]:
+    """
+    Process multiple uploaded PDF files, yielding structured chunks as each file finishes.
+
+    Files are extracted concurrently in worker processes when more than one
+    PDF is uploaded; chunks are yielded in upload order, so a consumer can
+    start embedding the first file while later ones are still extracting.
+
+    Args:
+        uploaded_files: List of Streamlit uploaded file objects
+
+    Yields:
+        Dict: Chunk dictionary with metadata
     """
-    all_chunks = []
-    processing_results = []
+    total_chunks = 0
+    processing_results = [None] * len(uploaded_files)
+    pending = []  # (file_idx, name, pdf_bytes) for files that passed validation
 
     for file_idx, uploaded_file in enumerate(uploaded_files):
         logger.info(f"Processing file {file_idx + 1}/{len(uploaded_files)}: {uploaded_file.name}")
@@ -221,75 +421,37 @@ def process_uploaded_pdfs(uploaded_files) -> List[Dict[str, Any]]:
         # Validate file
         if not uploaded_file.name.lower().endswith('.pdf'):
             logger.warning(f"Skipping non-PDF file: {uploaded_file.name}")
-            processing_results.append({
+            processing_results[file_idx] = {
                 "filename": uploaded_file.name,
                 "status": "skipped",
                 "reason": "Not a PDF file"
-            })
+            }
             continue
 
-        # Check file size
-        file_size = uploaded_file.size if hasattr(uploaded_file, 'size') else len(uploaded_file.getvalue())
+        # Read the bytes once; they are both the size check and what gets extracted.
+        # Streamlit file handles can't be sent to worker processes anyway.
+        pdf_bytes = uploaded_file.getvalue()
+        file_size = len(pdf_bytes)
         logger.info(f"File size: {file_size} bytes")
 
         if file_size == 0:
             logger.warning(f"Empty file: {uploaded_file.name}")
-            processing_results.append({
+            processing_results[file_idx] = {
                 "filename": uploaded_file.name,
                 "status": "failed",
                 "reason": "Empty file"
-            })
-            continue
-
-        # Extract text from PDF
-        text = extract_text_from_pdf(uploaded_file)
-
-        if not text or len(text.strip()) == 0:
-            logger.warning(f"No text extracted from {uploaded_file.name}")
-            processing_results.append({
-                "filename": uploaded_file.name,
-                "status": "failed",
-                "reason": "No text content found"
-            })
-            continue
-
-        logger.info(f"Extracted {len(text)} characters from {uploaded_file.name}")
-
-        # Create chunks
-        chunks = chunk_text(text)
-
-        if not chunks:
-            logger.warning(f"No chunks created from {uploaded_file.name}")
-            processing_results.append({
-                "filename": uploaded_file.name,
-                "status": "failed",
-                "reason": "Could not create text chunks"
-            })
-            continue
-
-        # Add metadata to each chunk
-        file_chunks = 0
-        for chunk_idx, chunk in enumerate(chunks):
-            chunk_data = {
-                "filename": uploaded_file.name,
-                "chunk_index": chunk_idx,
-                "text": chunk,
-                "file_index": file_idx,
-                "original_text_length": len(text)
             }
-            all_chunks.append(chunk_data)
-            file_chunks += 1
+            continue
 
-        processing_results.append({
-            "filename": uploaded_file.name,
-            "status": "success",
-            "chunks_created": file_chunks,
-            "text_length": len(text)
-        })
+        pending.append((file_idx, uploaded_file.name, pdf_bytes))
 
-        logger.info(f"Successfully processed {uploaded_file.name}: {file_chunks} chunks created")
+    # Outcomes follow upload order regardless of which worker finished first
+    for (file_idx, _, _), (file_chunks, result) in zip(pending, _iter_pdf_outcomes(pending)):
+        processing_results[file_idx] = result
+        total_chunks += len(file_chunks)
+        yield from file_chunks
 
-    logger.info(f"Total chunks created: {len(all_chunks)} from {len(uploaded_files)} files")
+    logger.info(f"Total chunks created: {total_chunks} from {len(uploaded_files)} files")
 
     # Log processing summary
     successful_files = [r for r in processing_results if r["status"] == "success"]
@@ -301,7 +463,18 @@ def process_uploaded_pdfs(uploaded_files) -> List[Dict[str, Any]]:
         for failed in failed_files:
             logger.warning(f"Failed to process {failed['filename']}: {failed['reason']}")
 
-    return all_chunks
+
+def process_uploaded_pdfs(uploaded_files) -> List[Dict[str, Any]]:
+    """
+    Process multiple uploaded PDF files and return structured chunks.
+
+    Args:
+        uploaded_files: List of Streamlit uploaded file objects
+
+    Returns:
+        List[Dict]: List of chunk dictionaries with metadata
+    """
+    return list(iter_uploaded_pdf_chunks(uploaded_files))
 
 
 def get_processing_stats(chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -317,21 +490,20 @@ def get_processing_stats(chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
     if not chunks:
         return {"total_chunks": 0, "total_files": 0, "avg_chunk_length": 0}
     
-    total_chunks = len(chunks)
-    unique_files = len(set(chunk["filename"] for chunk in chunks))
-    total_chars = sum(len(chunk["text"]) for chunk in chunks)
-    avg_chunk_length = total_chars / total_chunks if total_chunks > 0 else 0
-    
+    # One pass gathers the character total and per-file counts together
+    total_chars = 0
     file_stats = {}
     for chunk in chunks:
+        total_chars += len(chunk["text"])
         filename = chunk["filename"]
-        if filename not in file_stats:
-            file_stats[filename] = 0
-        file_stats[filename] += 1
+        file_stats[filename] = file_stats.get(filename, 0) + 1
+    
+    total_chunks = len(chunks)
+    avg_chunk_length = total_chars / total_chunks
     
     return {
         "total_chunks": total_chunks,
-        "total_files": unique_files,
+        "total_files": len(file_stats),
         "avg_chunk_length": round(avg_chunk_length, 2),
         "total_characters": total_chars,
         "file_breakdown": file_stats
@@ -4,12 +4,16 @@ Quiz Export Module - Generate Word and PDF documents from quiz data
 """
 
 import io
+import os
 import logging
+from collections import Counter
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, BinaryIO
+from xml.sax.saxutils import escape as _xml_escape
 from dataclasses import dataclass
 
 try:
+    import docx
     from docx import Document
     from docx.shared import Inches, Pt
     from docx.enum.text import WD_ALIGN_PARAGRAPH
@@ -30,6 +34,73 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+if DOCX_AVAILABLE:
+    # Read python-docx's default template once; Document() would otherwise locate
+    # and open it from disk on every export. If it cannot be read, exports
+    # fall back to Document()
+    try:
+        with open(os.path.join(os.path.dirname(docx.__file__), 'templates', 'default.docx'), 'rb') as _template_file:
+            _TEMPLATE_BYTES = _template_file.read()
+    except OSError as e:
+        logger.warning("Could not read the default Word template: %s", e)
+        _TEMPLATE_BYTES = None
+    
+    # Gap after a section: the template's 10pt paragraph spacing plus one blank
+    # 11pt line, i.e. what an empty spacer paragraph used to occupy
+    _SECTION_SPACING = Pt(22)
+    _NO_SPACING = Pt(0)
+    _HALF_INCH = Inches(0.5)
+
+# Option letters by zero-based position
+_LETTERS = tuple(chr(65 + i) for i in range(26))
+
+if REPORTLAB_AVAILABLE:
+    # The sample stylesheet is costly to build and the quiz styles never vary
+    # per export, so both are created once at import
+    _STYLES = getSampleStyleSheet()
+    
+    _TITLE_STYLE = ParagraphStyle(
+        'CustomTitle',
+        parent=_STYLES['Title'],
+        fontSize=18,
+        spaceAfter=30,
+        alignment=1  # Center
+    )
+    
+    _QUESTION_STYLE = ParagraphStyle(
+        'QuestionStyle',
+        parent=_STYLES['Normal'],
+        fontSize=12,
+        spaceAfter=10,
+        fontName='Helvetica-Bold'
+    )
+    
+    _OPTION_STYLE = ParagraphStyle(
+        'OptionStyle',
+        parent=_STYLES['Normal'],
+        fontSize=11,
+        leftIndent=20,
+        spaceAfter=5
+    )
+    
+    _ANSWER_STYLE = ParagraphStyle(
+        'AnswerStyle',
+        parent=_STYLES['Normal'],
+        fontSize=11,
+        fontName='Helvetica-Bold',
+        textColor=green,
+        spaceAfter=5
+    )
+    
+    _EXPLANATION_STYLE = ParagraphStyle(
+        'ExplanationStyle',
+        parent=_STYLES['Normal'],
+        fontSize=10,
+        leftIndent=20,
+        spaceAfter=15,
+        textColor=blue
+    )
+
 @dataclass
 class QuizExportData:
     """Data structure for quiz export."""
@@ -39,23 +110,40 @@ class QuizExportData:
     include_answers: bool = True
 
 
-def create_quiz_word_document(quiz_data: QuizExportData) -> Optional[io.BytesIO]:
+def _generated_time(metadata: Dict[str, Any]) -> str:
+    """Return the export timestamp, formatting the current time only when metadata has none."""
+    return metadata.get('generated_time') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _bold_then(paragraph, label: str, value: str) -> None:
+    """Append a bold label run followed by a plain value run to a Word paragraph."""
+    paragraph.add_run(label).bold = True
+    paragraph.add_run(value)
+
+
+def create_quiz_word_document(quiz_data: QuizExportData,
+                              output: Optional[BinaryIO] = None) -> Optional[BinaryIO]:
     """
     Create a Word document from quiz data.
     
     Args:
         quiz_data: QuizExportData containing quiz information
+        output: Writable binary file-like object (e.g. an open temp file or
+            response stream) to save the document to; an in-memory buffer is used if omitted
         
     Returns:
-        BytesIO buffer containing the Word document or None if failed
+        The output stream (a BytesIO rewound to the start when output is omitted)
+        containing the Word document, or None if failed
     """
     if not DOCX_AVAILABLE:
         logger.error("python-docx not available for Word document generation")
         return None
     
     try:
+        question_count = len(quiz_data.questions)
+        
         # Create document
-        doc = Document()
+        doc = Document(io.BytesIO(_TEMPLATE_BYTES)) if _TEMPLATE_BYTES else Document()
         
         # Add title
         title = doc.add_heading(quiz_data.title, 0)
@@ -63,18 +151,14 @@ def create_quiz_word_document(quiz_data: QuizExportData) -> Optional[io.BytesIO]
         
         # Add metadata
         metadata_para = doc.add_paragraph()
-        metadata_para.add_run("Generated: ").bold = True
-        metadata_para.add_run(f"{quiz_data.metadata.get('generated_time', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))}")
-        metadata_para.add_run("\nDifficulty: ").bold = True
-        metadata_para.add_run(f"{quiz_data.metadata.get('difficulty', 'Unknown').title()}")
-        metadata_para.add_run("\nTotal Questions: ").bold = True
-        metadata_para.add_run(f"{len(quiz_data.questions)}")
+        _bold_then(metadata_para, "Generated: ", _generated_time(quiz_data.metadata))
+        _bold_then(metadata_para, "\nDifficulty: ", quiz_data.metadata.get('difficulty', 'Unknown').title())
+        _bold_then(metadata_para, "\nTotal Questions: ", str(question_count))
         
         if quiz_data.metadata.get('topic_focus'):
-            metadata_para.add_run("\nTopic Focus: ").bold = True
-            metadata_para.add_run(f"{quiz_data.metadata.get('topic_focus')}")
+            _bold_then(metadata_para, "\nTopic Focus: ", f"{quiz_data.metadata.get('topic_focus')}")
         
-        doc.add_paragraph()  # Add space
+        metadata_para.paragraph_format.space_after = _SECTION_SPACING
         
         # Add instructions
         instructions = doc.add_paragraph()
@@ -84,44 +168,49 @@ def create_quiz_word_document(quiz_data: QuizExportData) -> Optional[io.BytesIO]
         else:
             instructions.add_run("Choose the best answer for each question.")
         
-        doc.add_paragraph()  # Add space
+        instructions.paragraph_format.space_after = _SECTION_SPACING
         
         # Add questions
         for i, question_data in enumerate(quiz_data.questions, 1):
             # Question number and text
-            question_para = doc.add_paragraph()
-            question_para.add_run(f"Question {i}: ").bold = True
-            question_para.add_run(question_data['question'])
+            question_para = last_para = doc.add_paragraph()
+            _bold_then(question_para, f"Question {i}: ", question_data['question'])
             
-            # Options
-            for j, option in enumerate(question_data['options'], 1):
-                option_para = doc.add_paragraph(f"   {chr(64 + j)}. {option['text']}", style='List Number')
-                option_para.paragraph_format.left_indent = Inches(0.5)
+            # Options, lettered in the text itself rather than through a numbered list style
+            options = question_data['options']
+            last_option = len(options)
+            for j, option in enumerate(options, 1):
+                option_para = last_para = doc.add_paragraph()
+                option_para.paragraph_format.left_indent = _HALF_INCH
+                if j < last_option:
+                    # Keep the options together; only the last one gets the normal paragraph gap
+                    option_para.paragraph_format.space_after = _NO_SPACING
+                option_para.add_run(f"{_LETTERS[j - 1]}. {option['text']}")
             
             # Correct answer (if included)
             if quiz_data.include_answers:
-                correct_option = next((opt for opt in question_data['options'] if opt['is_correct']), None)
-                if correct_option:
-                    correct_letter = chr(65 + next(i for i, opt in enumerate(question_data['options']) if opt['is_correct']))
-                    answer_para = doc.add_paragraph()
-                    answer_para.add_run("Correct Answer: ").bold = True
-                    answer_para.add_run(f"{correct_letter}. {correct_option['text']}")
+                correct_idx = next((idx for idx, opt in enumerate(options) if opt['is_correct']), -1)
+                if correct_idx >= 0:
+                    correct_option = options[correct_idx]
+                    correct_letter = _LETTERS[correct_idx]
+                    answer_para = last_para = doc.add_paragraph()
+                    _bold_then(answer_para, "Correct Answer: ", f"{correct_letter}. {correct_option['text']}")
                     
                     # Add explanation if available
                     if question_data.get('explanation'):
-                        explanation_para = doc.add_paragraph()
-                        explanation_para.add_run("Explanation: ").bold = True
-                        explanation_para.add_run(question_data['explanation'])
+                        explanation_para = last_para = doc.add_paragraph()
+                        _bold_then(explanation_para, "Explanation: ", question_data['explanation'])
             
-            # Add space between questions
-            doc.add_paragraph()
+            # Space between questions, on the question's last paragraph
+            last_para.paragraph_format.space_after = _SECTION_SPACING
         
-        # Save to BytesIO
-        buffer = io.BytesIO()
+        # Save straight to the caller's stream when given one
+        buffer = output if output is not None else io.BytesIO()
         doc.save(buffer)
-        buffer.seek(0)
+        if output is None:
+            buffer.seek(0)
         
-        logger.info(f"Successfully created Word document with {len(quiz_data.questions)} questions")
+        logger.info(f"Successfully created Word document with {question_count} questions")
         return buffer
         
     except Exception as e:
@@ -129,91 +218,88 @@ def create_quiz_word_document(quiz_data: QuizExportData) -> Optional[io.BytesIO]
         return None
 
 
-def create_quiz_pdf_document(quiz_data: QuizExportData) -> Optional[io.BytesIO]:
+def _render_question(number: int, question_data: Dict[str, Any], include_answers: bool) -> List[Any]:
+    """
+    Build the PDF flowables for one quiz question.
+    
+    Args:
+        number: 1-based question number
+        question_data: Question dictionary with 'question', 'options' and optional 'explanation'
+        include_answers: Whether to add the correct answer and explanation
+        
+    Returns:
+        List of Paragraph/Spacer flowables for the question
+    """
+    # The question and answer styles are already bold, so their labels need no <b> markup.
+    # Quiz text is escaped because Paragraph parses its input as markup.
+    flowables = [Paragraph(f"Question {number}: {_xml_escape(question_data['question'])}", _QUESTION_STYLE)]
+    flowables.extend([
+        Paragraph(f"{_LETTERS[j - 1]}. {_xml_escape(option['text'])}", _OPTION_STYLE)
+        for j, option in enumerate(question_data['options'], 1)
+    ])
+    
+    # Correct answer (if included)
+    if include_answers:
+        options = question_data['options']
+        correct_idx = next((idx for idx, opt in enumerate(options) if opt['is_correct']), -1)
+        if correct_idx >= 0:
+            correct_option = options[correct_idx]
+            flowables.append(Paragraph(f"Correct Answer: {_LETTERS[correct_idx]}. {_xml_escape(correct_option['text'])}", _ANSWER_STYLE))
+            
+            # Add explanation if available
+            if question_data.get('explanation'):
+                flowables.append(Paragraph(f"<b>Explanation:</b> {_xml_escape(question_data['explanation'])}", _EXPLANATION_STYLE))
+    
+    # Space between questions
+    flowables.append(Spacer(1, 20))
+    return flowables
+
+
+def create_quiz_pdf_document(quiz_data: QuizExportData,
+                             output: Optional[BinaryIO] = None) -> Optional[BinaryIO]:
     """
     Create a PDF document from quiz data.
     
     Args:
         quiz_data: QuizExportData containing quiz information
+        output: Writable binary file-like object (e.g. an open temp file or
+            response stream) to write the PDF to; an in-memory buffer is used if omitted
         
     Returns:
-        BytesIO buffer containing the PDF document or None if failed
+        The output stream (a BytesIO rewound to the start when output is omitted)
+        containing the PDF document, or None if failed
     """
     if not REPORTLAB_AVAILABLE:
         logger.error("reportlab not available for PDF document generation")
         return None
     
     try:
-        # Create buffer
-        buffer = io.BytesIO()
+        # Write straight to the caller's stream when given one
+        buffer = output if output is not None else io.BytesIO()
+        
+        question_count = len(quiz_data.questions)
         
         # Create document
         doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*inch)
         
-        # Get styles
-        styles = getSampleStyleSheet()
-        
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Title'],
-            fontSize=18,
-            spaceAfter=30,
-            alignment=1  # Center
-        )
-        
-        question_style = ParagraphStyle(
-            'QuestionStyle',
-            parent=styles['Normal'],
-            fontSize=12,
-            spaceAfter=10,
-            fontName='Helvetica-Bold'
-        )
-        
-        option_style = ParagraphStyle(
-            'OptionStyle',
-            parent=styles['Normal'],
-            fontSize=11,
-            leftIndent=20,
-            spaceAfter=5
-        )
-        
-        answer_style = ParagraphStyle(
-            'AnswerStyle',
-            parent=styles['Normal'],
-            fontSize=11,
-            fontName='Helvetica-Bold',
-            textColor=green,
-            spaceAfter=5
-        )
-        
-        explanation_style = ParagraphStyle(
-            'ExplanationStyle',
-            parent=styles['Normal'],
-            fontSize=10,
-            leftIndent=20,
-            spaceAfter=15,
-            textColor=blue
-        )
-        
         # Build content
         content = []
         
         # Title
-        content.append(Paragraph(quiz_data.title, title_style))
+        content.append(Paragraph(_xml_escape(quiz_data.title), _TITLE_STYLE))
         content.append(Spacer(1, 20))
         
         # Metadata
         metadata_text = f"""
-        <b>Generated:</b> {quiz_data.metadata.get('generated_time', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))}<br/>
+        <b>Generated:</b> {_generated_time(quiz_data.metadata)}<br/>
         <b>Difficulty:</b> {quiz_data.metadata.get('difficulty', 'Unknown').title()}<br/>
-        <b>Total Questions:</b> {len(quiz_data.questions)}
+        <b>Total Questions:</b> {question_count}
         """
         
         if quiz_data.metadata.get('topic_focus'):
-            metadata_text += f"<br/><b>Topic Focus:</b> {quiz_data.metadata.get('topic_focus')}"
+            metadata_text += f"<br/><b>Topic Focus:</b> {_xml_escape(quiz_data.metadata['topic_focus'])}"
         
-        content.append(Paragraph(metadata_text, styles['Normal']))
+        content.append(Paragraph(metadata_text, _STYLES['Normal']))
         content.append(Spacer(1, 20))
         
         # Instructions
@@ -223,41 +309,19 @@ def create_quiz_pdf_document(quiz_data: QuizExportData) -> Optional[io.BytesIO]:
         else:
             instructions_text += "Choose the best answer for each question."
         
-        content.append(Paragraph(instructions_text, styles['Normal']))
+        content.append(Paragraph(instructions_text, _STYLES['Normal']))
         content.append(Spacer(1, 30))
         
         # Questions
         for i, question_data in enumerate(quiz_data.questions, 1):
-            # Question
-            question_text = f"<b>Question {i}:</b> {question_data['question']}"
-            content.append(Paragraph(question_text, question_style))
-            
-            # Options
-            for j, option in enumerate(question_data['options'], 1):
-                option_text = f"{chr(64 + j)}. {option['text']}"
-                content.append(Paragraph(option_text, option_style))
-            
-            # Correct answer (if included)
-            if quiz_data.include_answers:
-                correct_option = next((opt for opt in question_data['options'] if opt['is_correct']), None)
-                if correct_option:
-                    correct_letter = chr(65 + next(i for i, opt in enumerate(question_data['options']) if opt['is_correct']))
-                    answer_text = f"<b>Correct Answer:</b> {correct_letter}. {correct_option['text']}"
-                    content.append(Paragraph(answer_text, answer_style))
-                    
-                    # Add explanation if available
-                    if question_data.get('explanation'):
-                        explanation_text = f"<b>Explanation:</b> {question_data['explanation']}"
-                        content.append(Paragraph(explanation_text, explanation_style))
-            
-            # Add space between questions
-            content.append(Spacer(1, 20))
+            content.extend(_render_question(i, question_data, quiz_data.include_answers))
         
         # Build PDF
         doc.build(content)
-        buffer.seek(0)
+        if output is None:
+            buffer.seek(0)
         
-        logger.info(f"Successfully created PDF document with {len(quiz_data.questions)} questions")
+        logger.info(f"Successfully created PDF document with {question_count} questions")
         return buffer
         
     except Exception as e:
@@ -276,25 +340,24 @@ def prepare_quiz_export_data(quiz_session, include_answers: bool = True) -> Quiz
     Returns:
         QuizExportData object ready for export
     """
-    questions_data = []
-
     # Access questions as attribute, not dictionary key
-    for question in quiz_session.questions:
-        question_data = {
+    questions_data = [
+        {
             'question': question.question,
             'options': [{'text': opt.text, 'is_correct': opt.is_correct} for opt in question.options],
             'explanation': question.explanation,
             'topic': question.topic,
             'difficulty': question.difficulty
         }
-        questions_data.append(question_data)
+        for question in quiz_session.questions
+    ]
 
     # Extract difficulty from first question since QuizSession doesn't store it directly
     difficulty = questions_data[0]['difficulty'] if questions_data else 'Unknown'
 
     # Extract topic focus from questions (look for common topic)
     topics = [q['topic'] for q in questions_data]
-    topic_focus = max(set(topics), key=topics.count) if topics else ''
+    topic_focus = Counter(topics).most_common(1)[0][0] if topics else ''
 
     metadata = {
         'generated_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -5,17 +5,56 @@ This module provides functionality to generate multiple choice questions (MCQs)
 from document content for viva exam preparation.
 """
 
+import io
+import os
+import re
+import asyncio
 import logging
 import json
 import random
-from typing import Dict, List, Any, Optional, Tuple
+import hashlib
+import itertools
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple, Union, Iterable
 from dataclasses import dataclass
 from datetime import datetime
 
+from utils import LRUDiskCache
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# In-memory LRU cache of raw AI MCQ responses keyed by the generation request,
+# used when a caller opts in with use_cache=True
+MCQ_CACHE_MAX_SIZE = 64
+
+# Responses are also persisted on disk (when diskcache is installed) for a day
+MCQ_DISK_CACHE_DIR = os.getenv('MCQ_CACHE_DIR', os.path.expanduser(os.path.join('~', '.cache', 'studyai', 'mcq')))
+MCQ_DISK_CACHE_EXPIRE = 86400  # seconds
+
+_MCQ_CACHE = LRUDiskCache("MCQ", MCQ_CACHE_MAX_SIZE, MCQ_DISK_CACHE_DIR, MCQ_DISK_CACHE_EXPIRE)
+
+# Fenced JSON in AI responses; a missing closing fence runs to the end of the text
+_JSON_FENCE_RE = re.compile(r"```json(.*?)(?:```|\Z)", re.DOTALL)
+_FENCE_RE = re.compile(r"```(.*?)(?:```|\Z)", re.DOTALL)
+
+# Term extraction patterns for document-specific fallback questions
+_CAPS_RE = re.compile(r'\b[A-Z][a-zA-Z]+\b')  # Capitalized words
+_CAMEL_RE = re.compile(r'\b[a-z]+[A-Z][a-zA-Z]*\b')  # camelCase
+_KEYWORDS_RE = re.compile(r'\b(?:class|interface|method|function|variable|array|string|int|boolean|public|private|static|void|return|if|else|for|while|try|catch)\b', re.IGNORECASE)
+_WORDS_RE = re.compile(r'\b[A-Za-z]+\b')
+
+# Phrases marking a line as a definition, explanation or technical content
+_MEANINGFUL_KEYWORDS = ('is', 'are', 'used for', 'allows', 'enables', 'provides', 'implements', 'defines', 'class', 'method', 'function', 'variable', 'syntax', 'example')
+
 
 @dataclass
 class MCQOption:
@@ -48,6 +87,20 @@ class QuizSession:
     total_questions: Optional[int] = None
 
 
+# Difficulty-specific instructions for the MCQ prompts
+OPENAI_DIFFICULTY_INSTRUCTIONS = {
+    "easy": "Focus on basic concepts, definitions, and simple recall. Use clear, straightforward language.",
+    "medium": "Include analytical questions requiring understanding of relationships, applications, and comparisons.",
+    "hard": "Create complex questions involving analysis, synthesis, evaluation, and advanced problem-solving."
+}
+
+GEMINI_DIFFICULTY_INSTRUCTIONS = {
+    "easy": "Focus on basic concepts, definitions, and simple recall.",
+    "medium": "Include analytical questions requiring understanding of relationships and applications.",
+    "hard": "Create complex questions involving analysis, synthesis, and advanced problem-solving."
+}
+
+
 def create_mcq_prompt_openai(context: str, num_questions: int = 5, difficulty: str = "medium", topic_focus: str = "") -> str:
     """
     Create a prompt for generating MCQs using OpenAI models with dynamic content.
@@ -62,13 +115,6 @@ def create_mcq_prompt_openai(context: str, num_questions: int = 5, difficulty: s
         str: Formatted prompt for OpenAI
     """
 
-    # Difficulty-specific instructions
-    difficulty_instructions = {
-        "easy": "Focus on basic concepts, definitions, and simple recall. Use clear, straightforward language.",
-        "medium": "Include analytical questions requiring understanding of relationships, applications, and comparisons.",
-        "hard": "Create complex questions involving analysis, synthesis, evaluation, and advanced problem-solving."
-    }
-
     # Topic focus instruction
     topic_instruction = f"\n- Focus specifically on: {topic_focus}" if topic_focus else ""
 
@@ -81,7 +127,7 @@ CRITICAL REQUIREMENTS:
 - Reference specific names, dates, processes, or examples mentioned in the content
 - Use EXACT terminology, syntax, keywords, and concepts from the document
 - Questions should reference specific sections, code examples, or explanations from the content
-- Difficulty level: {difficulty} - {difficulty_instructions.get(difficulty, "")}
+- Difficulty level: {difficulty} - {OPENAI_DIFFICULTY_INSTRUCTIONS.get(difficulty, "")}
 - Each question should have exactly 4 options (A, B, C, D)
 - Only ONE option should be correct
 - Questions should test understanding of the SPECIFIC document content
@@ -130,13 +176,6 @@ def create_mcq_prompt_gemini(context: str, num_questions: int = 5, difficulty: s
         str: Formatted prompt for Gemini
     """
 
-    # Difficulty-specific instructions
-    difficulty_instructions = {
-        "easy": "Focus on basic concepts, definitions, and simple recall.",
-        "medium": "Include analytical questions requiring understanding of relationships and applications.",
-        "hard": "Create complex questions involving analysis, synthesis, and advanced problem-solving."
-    }
-
     # Topic focus instruction
     topic_instruction = f"\n- Focus specifically on: {topic_focus}" if topic_focus else ""
 
@@ -149,7 +188,7 @@ CRITICAL REQUIREMENTS:
 - Reference specific names, dates, processes, or examples mentioned in the content
 - Use EXACT terminology, syntax, keywords, and concepts from the document
 - Questions should reference specific sections, code examples, or explanations from the content
-- Difficulty level: {difficulty} - {difficulty_instructions.get(difficulty, "")}
+- Difficulty level: {difficulty} - {GEMINI_DIFFICULTY_INSTRUCTIONS.get(difficulty, "")}
 - Each question should have exactly 4 options (A, B, C, D)
 - Only ONE option should be correct
 - Questions should test understanding of the SPECIFIC document content
@@ -184,56 +223,72 @@ IMPORTANT: Respond with ONLY valid JSON. No additional text before or after. Gen
     return prompt
 
 
-def parse_mcq_response(response_text: str) -> List[MCQuestion]:
+def _stream_question_items(json_text: str) -> List[Dict[str, Any]]:
+    """
+    Incrementally parse the "questions" array of an MCQ response with ijson.
+
+    Args:
+        json_text: JSON text of the response, possibly cut off part-way
+
+    Returns:
+        List[Dict]: Every question object that was complete before the text ended or became invalid
+    """
+    items = []
+    try:
+        for item in ijson.items(io.BytesIO(json_text.encode("utf-8")), "questions.item"):
+            items.append(item)
+    except ijson.JSONError as e:
+        logger.warning(f"MCQ response JSON is incomplete ({e}); keeping {len(items)} complete questions")
+    return items
+
+
+def parse_mcq_response(response_text: Union[str, Iterable[str]]) -> List[MCQuestion]:
     """
     Parse AI response and extract MCQ questions.
 
     Args:
-        response_text: Raw response from AI model
+        response_text: Raw response from AI model, either whole or as streamed text chunks
 
     Returns:
         List[MCQuestion]: Parsed questions
     """
+    if not isinstance(response_text, str):
+        # Join streamed chunks once instead of growing a string per chunk
+        response_text = "".join(response_text)
+
     try:
         # Try to extract JSON from response
         response_text = response_text.strip()
 
         # Find JSON content between ```json and ``` or just raw JSON
-        if "```json" in response_text:
-            start = response_text.find("```json") + 7
-            end = response_text.find("```", start)
-            if end == -1:  # No closing ```
-                json_text = response_text[start:].strip()
-            else:
-                json_text = response_text[start:end].strip()
-        elif "```" in response_text:
-            start = response_text.find("```") + 3
-            end = response_text.find("```", start)
-            if end == -1:  # No closing ```
-                json_text = response_text[start:].strip()
-            else:
-                json_text = response_text[start:end].strip()
-        else:
-            json_text = response_text
+        fence = _JSON_FENCE_RE.search(response_text) or _FENCE_RE.search(response_text)
+        json_text = fence.group(1).strip() if fence else response_text
 
         # Clean up common JSON issues
-        json_text = json_text.replace('\n', ' ').replace('\r', '')
-
-        # Try to fix incomplete JSON by finding the last complete question
-        if not json_text.endswith('}'):
-            # Find the last complete question block
-            last_complete = json_text.rfind('}')
-            if last_complete != -1:
-                # Find the questions array end
-                questions_end = json_text.rfind(']', 0, last_complete + 1)
-                if questions_end != -1:
-                    json_text = json_text[:questions_end + 1] + '}}'
-
-        # Parse JSON
-        data = json.loads(json_text)
+        json_text = json_text.replace('\n', ' ')
+        if '\r' in json_text:
+            json_text = json_text.replace('\r', '')
+
+        if IJSON_AVAILABLE:
+            # Parse question by question so a truncated response keeps its complete questions
+            question_items = _stream_question_items(json_text)
+        else:
+            # Try to fix incomplete JSON by finding the last complete question
+            if not json_text.endswith('}'):
+                # Find the last complete question block
+                last_complete = json_text.rfind('}')
+                if last_complete != -1:
+                    # Find the questions array end
+                    questions_end = json_text.rfind(']', 0, last_complete + 1)
+                    if questions_end != -1:
+                        json_text = json_text[:questions_end + 1] + '}}'
+
+            # Parse JSON
+            question_items = json.loads(json_text).get("questions", [])
+
         questions = []
 
-        for q_data in data.get("questions", []):
+        for q_data in question_items:
             # Skip incomplete questions
             if not q_data.get("question") or not q_data.get("options"):
                 continue
@@ -268,8 +323,91 @@ def parse_mcq_response(response_text: str) -> List[MCQuestion]:
         return []
 
 
+def _mcq_model_name(ai_client) -> Optional[str]:
+    """
+    Get the model name a client generates with.
+
+    Clients name it model_name, model_id or model; some use model for the
+    loaded model object instead, so only string values are used.
+    """
+    for attr in ("model_name", "model_id", "model"):
+        value = getattr(ai_client, attr, None)
+        if isinstance(value, str):
+            return value
+    return None
+
+
+def _mcq_cache_key(ai_client, context: str, num_questions: int, difficulty: str, topic_focus: str) -> str:
+    """
+    Build the MCQ cache key for a generation request.
+
+    The context is NFC-normalized and its whitespace collapsed so that
+    re-extracted copies of the same document map to the same entry. The
+    client's model name is included so switching models gives fresh questions.
+    """
+    normalized_context = " ".join(unicodedata.normalize("NFC", context).split())
+    request = json.dumps(
+        [type(ai_client).__name__, _mcq_model_name(ai_client), normalized_context,
+         num_questions, difficulty, topic_focus.strip().lower()],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+
+def _mcq_provider(ai_client) -> str:
+    """Identify which provider an AI client belongs to, as a key of _MCQ_PROVIDERS."""
+    if hasattr(ai_client, 'client') and 'openai' in str(type(ai_client.client)).lower():
+        return "openai"
+    if hasattr(ai_client, 'model') and hasattr(ai_client, 'config'):
+        return "gemini"
+    if hasattr(ai_client, 'base_url') and 'openrouter' in str(ai_client.base_url):
+        return "openrouter"
+    return "watsonx"
+
+
+def _request_mcqs_openai(ai_client, context: str, num_questions: int, difficulty: str, topic_focus: str) -> Dict[str, Any]:
+    """Ask an OpenAI client for MCQs."""
+    logger.info("Using OpenAI client for MCQ generation")
+    from openai_integration import query_openai
+    prompt = create_mcq_prompt_openai(context, num_questions, difficulty, topic_focus)
+    return query_openai(ai_client, "", prompt)  # Empty context since prompt contains everything
+
+
+def _request_mcqs_gemini(ai_client, context: str, num_questions: int, difficulty: str, topic_focus: str) -> Dict[str, Any]:
+    """Ask a Gemini client for MCQs."""
+    logger.info("Using Gemini client for MCQ generation")
+    from gemini_integration import query_gemini
+    prompt = create_mcq_prompt_gemini(context, num_questions, difficulty, topic_focus)
+    return query_gemini(ai_client, "", prompt)  # Empty context since prompt contains everything
+
+
+def _request_mcqs_openrouter(ai_client, context: str, num_questions: int, difficulty: str, topic_focus: str) -> Dict[str, Any]:
+    """Ask an OpenRouter client for MCQs."""
+    logger.info("Using OpenRouter client for MCQ generation")
+    from openrouter_integration import generate_mcqs_with_openrouter
+    return {"success": True, "response": generate_mcqs_with_openrouter(ai_client, context, num_questions, difficulty, topic_focus)}
+
+
+def _request_mcqs_watsonx(ai_client, context: str, num_questions: int, difficulty: str, topic_focus: str) -> Dict[str, Any]:
+    """Ask any other client (watsonx) for MCQs using the OpenAI prompt format."""
+    logger.info("Using fallback client for MCQ generation")
+    from watsonx_integration import query_watsonx
+    prompt = create_mcq_prompt_openai(context, num_questions, difficulty, topic_focus)  # Use OpenAI format as default
+    return query_watsonx(ai_client, "", prompt)
+
+
+# MCQ request function for each provider returned by _mcq_provider
+_MCQ_PROVIDERS = {
+    "openai": _request_mcqs_openai,
+    "gemini": _request_mcqs_gemini,
+    "openrouter": _request_mcqs_openrouter,
+    "watsonx": _request_mcqs_watsonx,
+}
+
+
 def generate_mcqs_with_ai(ai_client, context: str, num_questions: int = 5,
-                         difficulty: str = "medium", topic_focus: str = "") -> List[MCQuestion]:
+                         difficulty: str = "medium", topic_focus: str = "",
+                         use_cache: bool = False) -> List[MCQuestion]:
     """
     Generate MCQs using the specified AI client.
 
@@ -278,6 +416,9 @@ def generate_mcqs_with_ai(ai_client, context: str, num_questions: int = 5,
         context: Document content to generate questions from
         num_questions: Number of questions to generate
         difficulty: Difficulty level
+        topic_focus: Optional specific topic to focus on
+        use_cache: Whether to reuse the AI response from an identical earlier request
+            instead of asking for a fresh set of questions
 
     Returns:
         List[MCQuestion]: Generated questions
@@ -286,33 +427,21 @@ def generate_mcqs_with_ai(ai_client, context: str, num_questions: int = 5,
         logger.info(f"AI Client type: {type(ai_client)}")
         logger.info(f"Context length: {len(context)} characters")
 
-        # Determine client type and create appropriate prompt
-        if hasattr(ai_client, 'client') and 'openai' in str(type(ai_client.client)).lower():
-            logger.info("Using OpenAI client for MCQ generation")
-            from openai_integration import query_openai
-            prompt = create_mcq_prompt_openai(context, num_questions, difficulty, topic_focus)
-            result = query_openai(ai_client, "", prompt)  # Empty context since prompt contains everything
-
-        elif hasattr(ai_client, 'model') and hasattr(ai_client, 'config'):
-            logger.info("Using Gemini client for MCQ generation")
-            from gemini_integration import query_gemini
-            prompt = create_mcq_prompt_gemini(context, num_questions, difficulty, topic_focus)
-            result = query_gemini(ai_client, "", prompt)  # Empty context since prompt contains everything
+        cache_key = _mcq_cache_key(ai_client, context, num_questions, difficulty, topic_focus) if use_cache else None
+        if cache_key:
+            cached = _MCQ_CACHE.get(cache_key)
+            questions = parse_mcq_response(cached) if cached is not None else []
+            if questions:
+                logger.info(f"Using cached MCQ response ({len(questions)} questions)")
+                return questions
 
-        elif hasattr(ai_client, 'base_url') and 'openrouter' in str(ai_client.base_url):
-            logger.info("Using OpenRouter client for MCQ generation")
-            from openrouter_integration import generate_mcqs_with_openrouter
-            result = {"success": True, "response": generate_mcqs_with_openrouter(ai_client, context, num_questions, difficulty, topic_focus)}
-
-        else:
-            logger.info("Using fallback client for MCQ generation")
-            # Fallback for other clients
-            from watsonx_integration import query_watsonx
-            prompt = create_mcq_prompt_openai(context, num_questions, difficulty, topic_focus)  # Use OpenAI format as default
-            result = query_watsonx(ai_client, "", prompt)
+        # Determine client type and send the matching prompt
+        result = _MCQ_PROVIDERS[_mcq_provider(ai_client)](ai_client, context, num_questions, difficulty, topic_focus)
 
         if result.get("success") and result.get("response"):
             questions = parse_mcq_response(result["response"])
+            if questions and cache_key:
+                _MCQ_CACHE.put(cache_key, result["response"])
 
             # If parsing failed, try fallback generation
             if not questions:
@@ -332,6 +461,58 @@ def generate_mcqs_with_ai(ai_client, context: str, num_questions: int = 5,
         return generate_document_specific_questions(context, num_questions, difficulty, topic_focus)
 
 
+async def generate_mcqs_with_ai_async(ai_client, context: str, num_questions: int = 5,
+                                     difficulty: str = "medium", topic_focus: str = "",
+                                     use_cache: bool = False) -> List[MCQuestion]:
+    """
+    Generate MCQs without blocking the event loop.
+
+    The provider SDK calls are blocking, so generation runs in a worker thread.
+    Arguments and return value are as for generate_mcqs_with_ai.
+    """
+    return await asyncio.to_thread(generate_mcqs_with_ai, ai_client, context, num_questions,
+                                   difficulty, topic_focus, use_cache)
+
+
+async def generate_mcqs_for_clients(ai_clients: List[Any], context: str, num_questions: int = 5,
+                                    difficulty: str = "medium", topic_focus: str = "") -> List[List[MCQuestion]]:
+    """
+    Generate MCQs from several AI clients concurrently.
+
+    Args:
+        ai_clients: AI clients to ask (e.g. OpenAI, Gemini and OpenRouter)
+        context: Document content to generate questions from
+        num_questions: Number of questions to generate per client
+        difficulty: Difficulty level
+        topic_focus: Optional specific topic to focus on
+
+    Returns:
+        List[List[MCQuestion]]: Questions from each client, in the same order as ai_clients
+    """
+    return await asyncio.gather(*[
+        generate_mcqs_with_ai_async(ai_client, context, num_questions, difficulty, topic_focus)
+        for ai_client in ai_clients
+    ])
+
+
+def generate_mcqs_for_clients_sync(ai_clients: List[Any], context: str, num_questions: int = 5,
+                                   difficulty: str = "medium", topic_focus: str = "") -> List[List[MCQuestion]]:
+    """
+    Blocking wrapper around generate_mcqs_for_clients for synchronous callers.
+
+    Args:
+        ai_clients: AI clients to ask
+        context: Document content to generate questions from
+        num_questions: Number of questions to generate per client
+        difficulty: Difficulty level
+        topic_focus: Optional specific topic to focus on
+
+    Returns:
+        List[List[MCQuestion]]: Questions from each client, in the same order as ai_clients
+    """
+    return asyncio.run(generate_mcqs_for_clients(ai_clients, context, num_questions, difficulty, topic_focus))
+
+
 def generate_document_specific_questions(context: str, num_questions: int = 5,
                                        difficulty: str = "medium", topic_focus: str = "") -> List[MCQuestion]:
     """
@@ -347,9 +528,6 @@ def generate_document_specific_questions(context: str, num_questions: int = 5,
         List[MCQuestion]: Document-specific questions
     """
     try:
-        import re
-        import random
-
         logger.info(f"Generating {num_questions} document-specific {difficulty} questions")
 
         if not context or len(context.strip()) < 50:
@@ -363,15 +541,16 @@ def generate_document_specific_questions(context: str, num_questions: int = 5,
         meaningful_sentences = []
         for line in lines:
             # Look for lines that contain definitions, explanations, or technical content
-            if any(keyword in line.lower() for keyword in ['is', 'are', 'used for', 'allows', 'enables', 'provides', 'implements', 'defines', 'class', 'method', 'function', 'variable', 'syntax', 'example']):
+            lowered = line.lower()
+            if any(keyword in lowered for keyword in _MEANINGFUL_KEYWORDS):
                 if len(line) > 20 and len(line) < 200:  # Reasonable length
                     meaningful_sentences.append(line)
 
         # Extract technical terms and concepts
         technical_terms = set()
-        words = re.findall(r'\b[A-Z][a-zA-Z]+\b', context)  # Capitalized words
-        code_terms = re.findall(r'\b[a-z]+[A-Z][a-zA-Z]*\b', context)  # camelCase
-        keywords = re.findall(r'\b(?:class|interface|method|function|variable|array|string|int|boolean|public|private|static|void|return|if|else|for|while|try|catch)\b', context, re.IGNORECASE)
+        words = _CAPS_RE.findall(context)
+        code_terms = _CAMEL_RE.findall(context)
+        keywords = _KEYWORDS_RE.findall(context)
 
         technical_terms.update(words[:20])  # Limit to avoid too many
         technical_terms.update(code_terms[:10])
@@ -380,23 +559,24 @@ def generate_document_specific_questions(context: str, num_questions: int = 5,
         # Remove common words
         common_words = {'The', 'This', 'That', 'With', 'From', 'When', 'Where', 'What', 'How', 'Why', 'Which', 'And', 'Or', 'But', 'For', 'In', 'On', 'At', 'To', 'Of', 'By'}
         technical_terms = [term for term in technical_terms if term not in common_words and len(term) > 2]
+        technical_term_set = set(technical_terms)
 
         questions = []
-        used_content = set()
 
-        for i in range(num_questions):
-            if meaningful_sentences and technical_terms:
-                # Select a sentence that hasn't been used
-                available_sentences = [s for s in meaningful_sentences if s not in used_content]
-                if not available_sentences:
-                    available_sentences = meaningful_sentences
+        # Pick distinct sentences first; once every sentence is used, any may repeat
+        chosen_sentences = []
+        if meaningful_sentences and technical_terms:
+            unique_sentences = list(dict.fromkeys(meaningful_sentences))
+            chosen_sentences = random.sample(unique_sentences, min(num_questions, len(unique_sentences)))
+            chosen_sentences += random.choices(meaningful_sentences, k=num_questions - len(chosen_sentences))
 
-                sentence = random.choice(available_sentences)
-                used_content.add(sentence)
+        for i in range(num_questions):
+            if chosen_sentences:
+                sentence = chosen_sentences[i]
 
                 # Extract a key term from the sentence
-                sentence_words = re.findall(r'\b[A-Za-z]+\b', sentence)
-                key_terms = [word for word in sentence_words if word in technical_terms]
+                sentence_words = _WORDS_RE.findall(sentence)
+                key_terms = [word for word in sentence_words if word in technical_term_set]
 
                 if key_terms:
                     key_term = random.choice(key_terms)
@@ -448,15 +628,13 @@ def generate_fallback_questions(context: str, num_questions: int = 5,
     try:
         # Extract key terms and concepts from context
         words = context.lower().split()
+        word_set = set(words)
 
         # Extract document-specific terms (words that appear multiple times)
-        word_freq = {}
-        for word in words:
-            if len(word) > 3 and word.isalpha():  # Filter meaningful words
-                word_freq[word] = word_freq.get(word, 0) + 1
+        word_freq = Counter(word for word in words if len(word) > 3 and word.isalpha())  # Filter meaningful words
 
         # Get most frequent terms from the document
-        document_terms = [word for word, freq in sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:20]]
+        document_terms = [word for word, freq in word_freq.most_common(20)]
 
         # Categorized terms for different topics and difficulties (as fallback)
         term_categories = {
@@ -499,7 +677,7 @@ def generate_fallback_questions(context: str, num_questions: int = 5,
             for cat, terms_by_diff in term_categories.items():
                 score = 0
                 for diff_terms in terms_by_diff.values():
-                    score += sum(1 for term in diff_terms if term in words)
+                    score += sum(1 for term in diff_terms if term in word_set)
                 category_scores[cat] = score
             category = max(category_scores, key=category_scores.get)
 
@@ -516,13 +694,13 @@ def generate_fallback_questions(context: str, num_questions: int = 5,
 
         # Then, find predefined terms that actually appear in the context
         for term in available_terms:
-            if term in words and term not in context_terms and len(context_terms) < num_questions:
+            if term in word_set and term not in context_terms and len(context_terms) < num_questions:
                 context_terms.append(term)
 
         # If no specific terms found, use general terms from context
         if not context_terms:
             for term in term_categories["general"][difficulty]:
-                if term in words and len(context_terms) < num_questions:
+                if term in word_set and len(context_terms) < num_questions:
                     context_terms.append(term)
 
         # If still no terms, use document terms or fallback to available terms
@@ -536,7 +714,9 @@ def generate_fallback_questions(context: str, num_questions: int = 5,
         templates = get_dynamic_templates(difficulty, category)
 
         questions = []
-        used_templates = []
+
+        # Rotate through the templates in a random order so none repeats within a round
+        template_cycle = itertools.cycle(random.sample(templates, len(templates)))
 
         # Generate questions up to the requested number
         for i in range(num_questions):
@@ -546,13 +726,7 @@ def generate_fallback_questions(context: str, num_questions: int = 5,
                 # Generate additional terms if needed
                 term = f"Concept {i+1}"
 
-            # Select a random template that hasn't been used recently
-            available_templates = [t for t in templates if t not in used_templates[-3:]]
-            if not available_templates:
-                available_templates = templates
-
-            template = random.choice(available_templates)
-            used_templates.append(template)
+            template = next(template_cycle)
 
             # Generate dynamic options
             options = generate_dynamic_options(term, difficulty, category, template)
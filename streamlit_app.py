@@ -10,14 +10,14 @@ from typing import List, Dict, Any
 
 # Import custom modules
 try:
-    from pdf_processing import process_uploaded_pdfs, get_processing_stats
+    from pdf_processing import iter_uploaded_pdf_chunks, get_processing_stats
     from embedding_retrieval import initialize_retrieval_system, format_retrieved_chunks, get_chunk_sources
     from watsonx_integration import initialize_watsonx_client, query_watsonx, format_error_response
-    from huggingface_integration import initialize_huggingface_client, create_academic_prompt_hf
-    from openai_integration import initialize_openai_client, query_openai
-    from gemini_integration import initialize_gemini_client, query_gemini
+    from huggingface_integration import get_huggingface_client, create_academic_prompt_hf
+    from openai_integration import get_openai_client, create_academic_prompt_openai
+    from gemini_integration import get_gemini_client, query_gemini
     from deepseek_integration import initialize_deepseek_client, query_deepseek
-    from openrouter_integration import OpenRouterClient
+    from openrouter_integration import OpenRouterClient, query_openrouter_deepseek, query_openrouter_deepseek_stream
     from quiz_generator import (
         generate_mcqs_with_ai, create_quiz_session, calculate_quiz_score,
         get_quiz_feedback, MCQuestion, QuizSession
@@ -605,7 +605,7 @@ def initialize_ai_clients():
             # Try OpenAI if DeepSeek failed
             if not success:
                 try:
-                    st.session_state.openai_client = initialize_openai_client()
+                    st.session_state.openai_client = get_openai_client()
                     if st.session_state.openai_client:
                         st.success("✅ OpenAI initialized successfully")
                         st.session_state.ai_provider = "openai"
@@ -619,7 +619,7 @@ def initialize_ai_clients():
             # Try Gemini if OpenAI failed
             if not success:
                 try:
-                    st.session_state.gemini_client = initialize_gemini_client()
+                    st.session_state.gemini_client = get_gemini_client()
                     if st.session_state.gemini_client:
                         st.success("✅ Google Gemini initialized successfully")
                         st.session_state.ai_provider = "gemini"
@@ -647,7 +647,7 @@ def initialize_ai_clients():
             # Try Hugging Face if previous failed
             if not success:
                 try:
-                    st.session_state.huggingface_client = initialize_huggingface_client()
+                    st.session_state.huggingface_client = get_huggingface_client()
                     if st.session_state.huggingface_client:
                         st.success("✅ Hugging Face initialized successfully")
                         st.session_state.ai_provider = "huggingface"
@@ -690,7 +690,7 @@ def initialize_ai_clients():
 
         elif provider == "openai":
             try:
-                st.session_state.openai_client = initialize_openai_client()
+                st.session_state.openai_client = get_openai_client()
                 if st.session_state.openai_client:
                     st.success("✅ OpenAI initialized successfully")
                 else:
@@ -701,7 +701,7 @@ def initialize_ai_clients():
 
         elif provider == "gemini":
             try:
-                st.session_state.gemini_client = initialize_gemini_client()
+                st.session_state.gemini_client = get_gemini_client()
                 if st.session_state.gemini_client:
                     st.success("✅ Google Gemini initialized successfully")
                 else:
@@ -723,7 +723,7 @@ def initialize_ai_clients():
 
         elif provider == "huggingface":
             try:
-                st.session_state.huggingface_client = initialize_huggingface_client()
+                st.session_state.huggingface_client = get_huggingface_client()
                 if st.session_state.huggingface_client:
                     st.success("✅ Hugging Face initialized successfully")
                 else:
@@ -802,6 +802,24 @@ def display_ai_status():
             st.write("• Content-based on your uploaded documents")
 
 
+def get_document_stats(chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Get processing stats for the loaded chunks, recomputed only when the chunk list changes.
+
+    Args:
+        chunks: Chunk list held in session state
+
+    Returns:
+        Dict: Statistics from get_processing_stats
+    """
+    cached = st.session_state.get("_document_stats")
+    # Chunk lists are replaced, never mutated, so identity marks a change
+    if cached is None or cached[0] is not chunks:
+        cached = (chunks, get_processing_stats(chunks))
+        st.session_state._document_stats = cached
+    return cached[1]
+
+
 def display_sidebar():
     """Display sidebar with configuration and stats."""
     with st.sidebar:
@@ -940,7 +958,7 @@ def display_sidebar():
         
         # Document processing stats
         if st.session_state.chunks:
-            processing_stats = get_processing_stats(st.session_state.chunks)
+            processing_stats = get_document_stats(st.session_state.chunks)
             st.markdown("### Document Stats")
             st.metric("Files Processed", processing_stats["total_files"])
             st.metric("Text Chunks", processing_stats["total_chunks"])
@@ -1015,7 +1033,7 @@ def handle_pdf_upload():
         # Display file information
         st.write(f"📁 **{len(uploaded_files)} file(s) selected:**")
         for i, file in enumerate(uploaded_files):
-            file_size = len(file.getvalue()) if hasattr(file, 'getvalue') else 0
+            file_size = getattr(file, 'size', 0)
             st.write(f"   {i+1}. {file.name} ({file_size:,} bytes)")
 
         if st.button("Process PDFs", type="primary"):
@@ -1026,13 +1044,13 @@ def handle_pdf_upload():
                 status_text.text("Starting PDF processing...")
                 progress_bar.progress(10)
 
-                # Process PDFs
-                status_text.text("Extracting text from PDFs...")
-                chunks = process_uploaded_pdfs(uploaded_files)
+                # Process PDFs, embedding chunks as each file finishes extracting
+                status_text.text("Extracting text and building search index...")
+                retriever = initialize_retrieval_system(iter_uploaded_pdf_chunks(uploaded_files))
+                chunks = retriever.chunks
                 progress_bar.progress(60)
 
                 if chunks:
-                    status_text.text("Building search index...")
                     # Replace previous chunks with new ones (don't accumulate)
                     st.session_state.chunks = chunks
                     st.session_state.processed_files = [f.name for f in uploaded_files]
@@ -1044,8 +1062,7 @@ def handle_pdf_upload():
                     if hasattr(st.session_state, 'current_question_index'):
                         st.session_state.current_question_index = 0
 
-                    # Initialize retrieval system
-                    st.session_state.retriever = initialize_retrieval_system(chunks)
+                    st.session_state.retriever = retriever
                     progress_bar.progress(80)
 
                     # Initialize Watsonx client if not already done
@@ -1062,7 +1079,7 @@ def handle_pdf_upload():
                     st.success(f"✅ Successfully processed {len(uploaded_files)} files into {len(chunks)} chunks")
 
                     # Show processing statistics
-                    stats = get_processing_stats(chunks)
+                    stats = get_document_stats(chunks)
                     col1, col2, col3 = st.columns(3)
                     with col1:
                         st.metric("Files Processed", stats["total_files"])
@@ -1152,13 +1169,32 @@ def get_ai_provider_info():
         return {"name": "Demo Mode", "description": "Context-based responses from your documents"}
 
 
+def render_stream_preview(chunks) -> str:
+    """Show streamed text in a temporary preview and return the full text."""
+    preview = st.empty()
+    with preview.container():
+        text = st.write_stream(chunks)
+    preview.empty()
+    return text
+
+
 def query_ai_provider(client, context: str, question: str):
     """Query the appropriate AI provider."""
     try:
         # Check for DeepSeek client (direct or via OpenRouter)
         if (hasattr(client, 'base_url') and ('deepseek' in str(client.base_url).lower() or 'openrouter' in str(client.base_url).lower())) or \
            (hasattr(client, 'model') and 'deepseek' in str(client.model).lower()):
-            result = query_deepseek(client, question, context)
+            # Share the retriever's already loaded embedding model with the semantic answer cache
+            embedding_model = getattr(st.session_state.get('retriever'), 'model', None)
+            if isinstance(client, OpenRouterClient) and hasattr(st, "write_stream"):
+                # Stream tokens into a temporary preview; the caller renders
+                # the finished answer card
+                result = render_stream_preview(query_openrouter_deepseek_stream(client, context, question, embedding_model))
+            elif isinstance(client, OpenRouterClient):
+                # Streamlit before 1.31 has no write_stream; wait for the whole answer
+                result = query_openrouter_deepseek(client, context, question, embedding_model)
+            else:
+                result = query_deepseek(client, question, context)
             return {
                 "answer": result,
                 "success": bool(result),
@@ -1169,7 +1205,15 @@ def query_ai_provider(client, context: str, question: str):
 
         # Check for OpenAI client
         elif hasattr(client, 'client') and 'openai' in str(type(client.client)).lower():
-            result = query_openai(client, context, question)
+            prompt = create_academic_prompt_openai(context, question)
+            if hasattr(st, "write_stream"):
+                # Stream tokens into a temporary preview so the first words show
+                # up immediately; the caller renders the finished answer card
+                result = {}
+                render_stream_preview(client.generate_response_stream(prompt, result=result))
+            else:
+                # Streamlit before 1.31 has no write_stream; wait for the whole answer
+                result = client.generate_response(prompt)
             return {
                 "answer": result.get("response"),
                 "success": result.get("success", False),
@@ -1453,7 +1497,7 @@ def display_beautiful_qa_interface():
             """, unsafe_allow_html=True)
 
             for file in uploaded_files:
-                file_size = len(file.getvalue()) if hasattr(file, 'getvalue') else 0
+                file_size = getattr(file, 'size', 0)
                 st.markdown(f"""
                 <div class="source-card">
                     <strong>✅ {file.name}</strong><br>
@@ -1479,7 +1523,7 @@ def display_beautiful_qa_interface():
 
             # Display metrics
             if st.session_state.chunks:
-                stats = get_processing_stats(st.session_state.chunks)
+                stats = get_document_stats(st.session_state.chunks)
                 col1, col2, col3 = st.columns(3)
 
                 with col1:
@@ -2394,13 +2438,13 @@ def handle_pdf_processing(uploaded_files):
         status_text.text("🔄 Starting PDF processing...")
         progress_bar.progress(10)
 
-        # Process PDFs
-        status_text.text("📄 Extracting text from PDFs...")
-        chunks = process_uploaded_pdfs(uploaded_files)
+        # Process PDFs, embedding chunks as each file finishes extracting
+        status_text.text("📄 Extracting text and building search index...")
+        retriever = initialize_retrieval_system(iter_uploaded_pdf_chunks(uploaded_files))
+        chunks = retriever.chunks
         progress_bar.progress(60)
 
         if chunks:
-            status_text.text("🔍 Building search index...")
             # Replace previous chunks with new ones
             st.session_state.chunks = chunks
             st.session_state.processed_files = [f.name for f in uploaded_files]
@@ -2412,8 +2456,7 @@ def handle_pdf_processing(uploaded_files):
             if hasattr(st.session_state, 'current_question_index'):
                 st.session_state.current_question_index = 0
 
-            # Initialize retrieval system
-            st.session_state.retriever = initialize_retrieval_system(chunks)
+            st.session_state.retriever = retriever
             progress_bar.progress(80)
 
             # Initialize AI client if not already done
@@ -77,6 +77,56 @@ def test_image_processor():
     print("🎉 Image to Text test completed successfully!")
     return True
 
+def create_upright_layout_page():
+    """Create an upright page whose text blocks are spread unevenly across it."""
+    import cv2
+    import numpy as np
+
+    page = np.full((1000, 800), 255, np.uint8)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    # Title at the top right and a lone line at the bottom left
+    cv2.putText(page, "Chapter Title Here", (450, 60), font, 1, 0, 2)
+    cv2.putText(page, "a single footer line of text", (20, 960), font, 0.8, 0, 2)
+    # Ragged paragraph lines of varying length
+    for i, words in enumerate(["short line", "a somewhat longer line of words", "mid length text",
+                               "another long line that runs further", "end"]):
+        cv2.putText(page, words, (40, 300 + i * 40), font, 0.8, 0, 2)
+    return page
+
+def test_deskew_leaves_upright_page():
+    """Check that OCR preprocessing does not rotate an upright multi-block page."""
+    print("🧪 Testing deskew on an upright multi-block page")
+    from image_to_text import LOCAL_OCR_AVAILABLE
+    if not LOCAL_OCR_AVAILABLE:
+        print("⏭️ Local OCR libraries not available, skipping")
+        return True
+
+    import cv2
+    from image_to_text import _estimate_skew_angle, _preprocess_for_ocr
+
+    page = create_upright_layout_page()
+    ink = cv2.bitwise_not(cv2.threshold(page, 128, 255, cv2.THRESH_BINARY)[1])
+    angle = _estimate_skew_angle(ink)
+    print(f"📐 Estimated skew of upright page: {angle:.2f}°")
+    assert abs(angle) < 0.5, f"Upright page measured as skewed by {angle:.2f}°"
+
+    # Preprocessing must keep the text where it was (no rotation applied)
+    processed = _preprocess_for_ocr(page)
+    assert (processed[35:65, 450:750] == 0).any(), "Title moved during preprocessing"
+    assert (processed[940:965, 20:300] == 0).any(), "Footer line moved during preprocessing"
+
+    # A genuinely tilted copy is still detected
+    height, width = page.shape
+    tilted = cv2.warpAffine(page, cv2.getRotationMatrix2D((width / 2, height / 2), 4, 1.0),
+                            (width, height), borderValue=255)
+    tilted_ink = cv2.bitwise_not(cv2.threshold(tilted, 128, 255, cv2.THRESH_BINARY)[1])
+    tilted_angle = _estimate_skew_angle(tilted_ink)
+    print(f"📐 Estimated skew of page tilted by 4°: {tilted_angle:.2f}°")
+    assert abs(tilted_angle + 4) < 1, f"Tilted page measured as {tilted_angle:.2f}° instead of -4°"
+
+    print("✅ Deskew leaves upright pages alone and corrects tilted ones")
+    return True
+
 def display_setup_instructions():
     """Display setup instructions for Hugging Face API."""
     print("\n" + "=" * 60)
@@ -101,6 +151,7 @@ def display_setup_instructions():
     print("=" * 60)
 
 if __name__ == "__main__":
+    test_deskew_leaves_upright_page()
     success = test_image_processor()
     
     if not success:
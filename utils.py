@@ -6,8 +6,16 @@ Helper functions for session management, text processing, and export functionali
 import os
 from datetime import datetime
 from typing import List, Dict, Any, Optional
+from collections import OrderedDict
 import re
 import logging
+import threading
+
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -487,3 +495,84 @@ def log_user_action(action: str, details: Dict[str, Any] = None):
         log_entry += f" | Details: {details}"
     
     logger.info(log_entry)
+
+
+class LRUDiskCache:
+    """
+    In-memory LRU cache of strings backed by an optional on-disk cache.
+
+    Lookups check memory first, then disk (when diskcache is installed);
+    disk hits are promoted back into memory. Disk errors are logged and
+    treated as misses.
+    """
+
+    def __init__(self, name: str, max_size: int, disk_dir: Optional[str] = None,
+                 expire: Optional[float] = None):
+        """
+        Create the cache.
+
+        Args:
+            name: Label used in log messages
+            max_size: Maximum number of entries kept in memory
+            disk_dir: Directory for the persistent cache, or None for memory only
+            expire: Seconds before a disk entry expires, or None to keep it
+        """
+        self.name = name
+        self.max_size = max_size
+        self.disk_dir = disk_dir
+        self.expire = expire
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        self._disk_opened = False
+
+    def _get_disk(self) -> Optional["diskcache.Cache"]:
+        """Open the persistent cache on first use, or None if it is unavailable."""
+        with self._lock:
+            if not self._disk_opened:
+                self._disk_opened = True
+                if DISKCACHE_AVAILABLE and self.disk_dir:
+                    try:
+                        self._disk = diskcache.Cache(self.disk_dir)
+                    except Exception as e:
+                        logger.warning("%s disk cache unavailable: %s", self.name, e)
+            return self._disk
+
+    def _remember(self, key: str, value: str):
+        """Store a value in memory, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a cached value in memory, then on disk."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                return value
+
+        disk = self._get_disk()
+        if disk is None:
+            return None
+        try:
+            value = disk.get(key)
+        except Exception as e:
+            logger.warning("%s disk cache read failed: %s", self.name, e)
+            return None
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: str):
+        """Store a value in memory and on disk."""
+        self._remember(key, value)
+
+        disk = self._get_disk()
+        if disk is not None:
+            try:
+                disk.set(key, value, expire=self.expire)
+            except Exception as e:
+                logger.warning("%s disk cache write failed: %s", self.name, e)